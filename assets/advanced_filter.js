@@ -0,0 +1,26 @@
+// ---------------------------------------------------
+// Advanced Filter grid
+// ---------------------------------------------------
+// advanced-filter-grid uses AG Grid's infinite row model: it asks the server
+// for one block of filtered, sorted rows at a time (getRowsRequest). When the
+// filters, the country or the loaded dataset change, the cached blocks are
+// dropped so the grid asks again, and the grid is scrolled back to the first row.
+
+(function () {
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        advancedFilter: {
+
+            refresh: function (filterData, country, datasetKey) {
+                if (window.dash_ag_grid) {
+                    window.dash_ag_grid.getApiAsync("advanced-filter-grid").then(function (api) {
+                        api.purgeInfiniteCache();
+                    }).catch(function () {
+                        // Not mounted yet; it will ask for its first block when it is
+                    });
+                }
+                return {rowIndex: 0};
+            }
+        }
+    });
+})();
@@ -0,0 +1,310 @@
+// ---------------------------------------------------
+// Clientside indicator charts
+// ---------------------------------------------------
+// The server sends the selected ticker's bars once (price_bars_payload);
+// the MACD / RSI / EMA figures, their parameters and the shared date zoom
+// are all handled here, so none of them needs a server round-trip.
+//
+// Same warm-up semantics as the Python indicator engine: leading gaps stay
+// empty, later gaps are forward-filled, EMAs are seeded on the first value
+// and RSI is blank until `period` price changes have been seen. When the
+// parameters are the defaults, the server's series (advanced from the
+// ticker's stored state) are used as they are.
+
+(function () {
+
+    var GRAPH_PROPERTIES = {
+        mirror: true,
+        ticks: "outside",
+        showline: true,
+        linecolor: "lightgrey",
+        gridcolor: "lightgrey"
+    };
+    var FILL = "rgba(214,235,255,0.5)";
+
+    function prepare(values) {
+        var filled = new Array(values.length);
+        var leading = new Array(values.length);
+        var first = -1;
+        var last = null;
+
+        for (var i = 0; i < values.length; i++) {
+            if (values[i] !== null && !isNaN(values[i])) {
+                last = values[i];
+                if (first < 0) {
+                    first = i;
+                }
+            }
+            filled[i] = last;
+            leading[i] = first < 0;
+        }
+        for (var j = 0; j < first; j++) {
+            filled[j] = values[first];
+        }
+        return {filled: filled, leading: leading, first: first};
+    }
+
+    function smooth(filled, alpha) {
+        var out = new Array(filled.length);
+        for (var i = 0; i < filled.length; i++) {
+            out[i] = i === 0 ? filled[0] : alpha * filled[i] + (1 - alpha) * out[i - 1];
+        }
+        return out;
+    }
+
+    function blankLeading(series, leading) {
+        return series.map(function (value, i) { return leading[i] ? null : value; });
+    }
+
+    function ema(values, span) {
+        var input = prepare(values);
+        if (input.first < 0) {
+            return values.map(function () { return null; });
+        }
+        return blankLeading(smooth(input.filled, 2 / (span + 1)), input.leading);
+    }
+
+    function rsi(values, period) {
+        var input = prepare(values);
+        var n = values.length;
+        if (input.first < 0) {
+            return values.map(function () { return null; });
+        }
+
+        // The first price change seeds the averages
+        var seedAt = Math.min(input.first + 1, n - 1);
+        var seed = seedAt > 0 ? input.filled[seedAt] - input.filled[seedAt - 1] : 0;
+        var gains = new Array(n);
+        var losses = new Array(n);
+        for (var i = 0; i < n; i++) {
+            var delta = i < seedAt ? seed : input.filled[i] - input.filled[i - 1];
+            gains[i] = Math.max(delta, 0);
+            losses[i] = Math.max(-delta, 0);
+        }
+
+        var avgGain = smooth(gains, 1 / period);
+        var avgLoss = smooth(losses, 1 / period);
+        return avgGain.map(function (gain, i) {
+            if (i - input.first < period) {
+                return null;
+            }
+            if (avgLoss[i] === 0) {
+                return gain === 0 ? 50 : 100;
+            }
+            return 100 - 100 / (1 + gain / avgLoss[i]);
+        });
+    }
+
+    function macd(values, fast, slow, signal) {
+        var input = prepare(values);
+        if (input.first < 0) {
+            var empty = values.map(function () { return null; });
+            return {macd: empty, signal: empty, histogram: empty};
+        }
+
+        var fastLine = smooth(input.filled, 2 / (fast + 1));
+        var slowLine = smooth(input.filled, 2 / (slow + 1));
+        var macdLine = fastLine.map(function (value, i) { return value - slowLine[i]; });
+        var signalLine = smooth(macdLine, 2 / (signal + 1));
+        var histogram = macdLine.map(function (value, i) { return value - signalLine[i]; });
+
+        return {
+            macd: blankLeading(macdLine, input.leading),
+            signal: blankLeading(signalLine, input.leading),
+            histogram: blankLeading(histogram, input.leading)
+        };
+    }
+
+    function readParams(bars, emaShort, emaLong, rsiPeriod, macdFast, macdSlow, macdSignal) {
+        var defaults = bars.params;
+        function pick(value, fallback) {
+            var number = parseInt(value, 10);
+            return number > 0 ? number : fallback;
+        }
+        return {
+            ema_short: pick(emaShort, defaults.ema_short),
+            ema_long: pick(emaLong, defaults.ema_long),
+            rsi_period: pick(rsiPeriod, defaults.rsi_period),
+            macd_fast: pick(macdFast, defaults.macd_fast),
+            macd_slow: pick(macdSlow, defaults.macd_slow),
+            macd_signal: pick(macdSignal, defaults.macd_signal)
+        };
+    }
+
+    function computeIndicators(bars, params) {
+        var stored = bars.indicators;
+        var defaults = bars.params;
+        var close = bars.close;
+        var result = {};
+
+        if (params.ema_short === defaults.ema_short && params.ema_long === defaults.ema_long) {
+            result.emaShort = stored.EMA_10;
+            result.emaLong = stored.EMA_30;
+        } else {
+            result.emaShort = ema(close, params.ema_short);
+            result.emaLong = ema(close, params.ema_long);
+        }
+
+        result.rsi = params.rsi_period === defaults.rsi_period ? stored.RSI : rsi(close, params.rsi_period);
+
+        if (params.macd_fast === defaults.macd_fast && params.macd_slow === defaults.macd_slow &&
+                params.macd_signal === defaults.macd_signal) {
+            result.macd = {macd: stored.MACD, signal: stored["Signal Line"], histogram: stored["MACD Histogram"]};
+        } else {
+            result.macd = macd(close, params.macd_fast, params.macd_slow, params.macd_signal);
+        }
+        return result;
+    }
+
+    // Relayout ranges are plotly date strings ("2025-03-01 12:00:00.5"); read them as UTC, like bars.t
+    function toTime(value) {
+        if (typeof value === "number") {
+            return value;
+        }
+        var text = String(value).replace(" ", "T");
+        return Date.parse(text.length > 10 ? text + "Z" : text);
+    }
+
+    // y range over the points inside the zoomed x range (plotly autoranges over everything)
+    function visibleRange(time, seriesList, range) {
+        var start = toTime(range[0]);
+        var end = toTime(range[1]);
+        var low = Infinity;
+        var high = -Infinity;
+
+        seriesList.forEach(function (series) {
+            for (var i = 0; i < time.length; i++) {
+                var value = series[i];
+                if (time[i] >= start && time[i] <= end && value !== null && !isNaN(value)) {
+                    low = Math.min(low, value);
+                    high = Math.max(high, value);
+                }
+            }
+        });
+        if (!isFinite(low)) {
+            return null;
+        }
+        var buffer = (high - low) * 0.05 || Math.abs(high) * 0.05 || 1;
+        return [low - buffer, high + buffer];
+    }
+
+    function line(time, values, options) {
+        return Object.assign({type: "scatter", mode: "lines", x: time, y: values}, options);
+    }
+
+    function figure(bars, traces, range, shapes, annotations, fixedY) {
+        var yaxis = Object.assign({}, GRAPH_PROPERTIES);
+        if (fixedY) {
+            yaxis.range = fixedY;
+        } else if (range) {
+            var yRange = visibleRange(bars.t, traces.map(function (trace) { return trace.y; }), range);
+            if (yRange) {
+                yaxis.range = yRange;
+            }
+        }
+
+        var xaxis = Object.assign({type: "date"}, GRAPH_PROPERTIES);
+        if (range) {
+            xaxis.range = range;
+        } else {
+            xaxis.autorange = true;
+        }
+
+        return {
+            data: traces,
+            layout: {
+                title: {text: bars.title},
+                plot_bgcolor: "white",
+                legend: {orientation: "h", yanchor: "top", y: 1.2, xanchor: "right", x: 1},
+                xaxis: xaxis,
+                yaxis: yaxis,
+                shapes: shapes || [],
+                annotations: annotations || [],
+                // Keeps legend toggles while parameters or zoom change
+                uirevision: bars.ticker
+            }
+        };
+    }
+
+    function level(y, color, label) {
+        return {
+            shape: {type: "line", xref: "paper", x0: 0, x1: 1, yref: "y", y0: y, y1: y,
+                    line: {dash: "dot", color: color}},
+            annotation: {xref: "paper", x: 1, xanchor: "right", yref: "y", y: y, yanchor: "bottom",
+                         text: label, showarrow: false}
+        };
+    }
+
+    function emptyFigures() {
+        return [{data: [], layout: {}}, {data: [], layout: {}}, {data: [], layout: {}}];
+    }
+
+    // Reads an x range out of a graph's relayoutData: an array, null for a reset, or undefined if the x axis did not change
+    function relayoutRange(relayout) {
+        if (!relayout) {
+            return undefined;
+        }
+        if (relayout["xaxis.autorange"]) {
+            return null;
+        }
+        if (relayout["xaxis.range[0]"] !== undefined) {
+            return [relayout["xaxis.range[0]"], relayout["xaxis.range[1]"]];
+        }
+        if (relayout["xaxis.range"]) {
+            return relayout["xaxis.range"];
+        }
+        return undefined;
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        indicators: {
+
+            // Returns [macd, rsi, ema] figures
+            render: function (bars, range, emaShort, emaLong, rsiPeriod, macdFast, macdSlow, macdSignal) {
+                if (!bars || !bars.close || !bars.close.length) {
+                    return emptyFigures();
+                }
+
+                var params = readParams(bars, emaShort, emaLong, rsiPeriod, macdFast, macdSlow, macdSignal);
+                var series = computeIndicators(bars, params);
+                var time = bars.t;
+
+                var figEma = figure(bars, [
+                    line(time, bars.close, {name: "Close Price", line: {color: "#78afd9"}, fill: "tozeroy", fillcolor: FILL}),
+                    line(time, series.emaShort, {name: params.ema_short + "-Day EMA", line: {color: "orange", dash: "dot"}}),
+                    line(time, series.emaLong, {name: params.ema_long + "-Day EMA", line: {color: "green", dash: "dot"}})
+                ], range);
+
+                var overbought = level(70, "grey", "Overbought (70)");
+                var oversold = level(30, "green", "Oversold (30)");
+                var figRsi = figure(bars, [
+                    line(time, series.rsi, {name: "RSI", line: {color: "#78afd9"}, fill: "tozeroy", fillcolor: FILL})
+                ], range, [overbought.shape, oversold.shape], [overbought.annotation, oversold.annotation],
+                range ? [0, 100] : null);
+
+                var figMacd = figure(bars, [
+                    line(time, series.macd.macd, {name: "MACD", line: {color: "green"}}),
+                    line(time, series.macd.signal, {name: "Signal Line", line: {color: "grey", dash: "dot"}}),
+                    line(time, series.macd.histogram, {name: "Momentum", fill: "tozeroy", fillcolor: FILL, line: {color: "#78afd9"}})
+                ], range);
+
+                return [figMacd, figRsi, figEma];
+            },
+
+            // Shared x range for a page's charts: follows whichever graph was zoomed, resets on a new ticker
+            zoom: function () {
+                var triggered = window.dash_clientside.callback_context.triggered;
+                if (!triggered || !triggered.length) {
+                    return window.dash_clientside.no_update;
+                }
+
+                var prop = triggered[0].prop_id;
+                if (prop.slice(-5) === ".data") {
+                    return null;
+                }
+                var range = relayoutRange(triggered[0].value);
+                return range === undefined ? window.dash_clientside.no_update : range;
+            }
+        }
+    });
+})();
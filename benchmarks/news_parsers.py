@@ -0,0 +1,146 @@
+"""
+Times the Investegate / MQL5 news parsers in mypowerBY against the original
+BeautifulSoup implementations, on pages recorded with STOCKDASH_PROVIDER=record.
+
+    python benchmarks/news_parsers.py [fixtures_dir]
+
+fixtures_dir defaults to $STOCKDASH_FIXTURES or data/fixtures; pages are read
+from its pages/ folder. data/fixtures/pages holds a small Investegate and
+MQL5 page in the sites' markup; record real ones with STOCKDASH_PROVIDER=record
+for representative timings. Memory is the tracemalloc peak, so it only counts
+Python allocations (not libxml2's own tree).
+"""
+import os
+import re
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from bs4 import BeautifulSoup
+
+fixtures_dir = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("STOCKDASH_FIXTURES", "data/fixtures")
+os.environ["STOCKDASH_PROVIDER"] = "replay"
+os.environ["STOCKDASH_FIXTURES"] = fixtures_dir
+os.environ["STOCKDASH_BACKGROUND_JOBS"] = "0"   # only the parsers are needed, not the warm-up / watcher / crawler
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mypowerBY  # noqa: E402
+
+RUNS = 20
+
+
+def reference_parse_rns_page(page, ticker):
+    news_rns = []
+    soup = BeautifulSoup(page, "html.parser")
+    table = soup.find("table", class_="table-investegate")
+    if not table:
+        raise Exception("Could not find the expected table on the page.")
+
+    for row in table.find("tbody").find_all("tr"):
+        cols = row.find_all("td")
+        if len(cols) < 4:
+            continue
+        try:
+            dt = datetime.strptime(f"{cols[0].get_text(strip=True)} {cols[1].get_text(strip=True)}", "%d %b %Y %I:%M %p")
+            dt = dt.replace(tzinfo=ZoneInfo("Europe/London"))
+        except Exception:
+            continue
+
+        publisher_tag = cols[2].find("a", class_="source-RNS")
+        publisher = publisher_tag.get_text(strip=True) if publisher_tag else "Unknown"
+        announcement_tag = cols[3].find("a", class_="announcement-link")
+        if not announcement_tag:
+            continue
+
+        news_rns.append({
+            "Date": dt,
+            "Ticker": ticker,
+            "link": f'<a href="{announcement_tag["href"]}" target="_blank">{announcement_tag.get_text(strip=True)}</a>',
+            "publisher": publisher
+        })
+    return news_rns
+
+
+def reference_parse_mql5_page(page, ticker):
+    news_items = []
+    soup = BeautifulSoup(page, "html.parser")
+    news_section = soup.find("div", class_="nav-symbol__section nav-symbol__news")
+    if not news_section:
+        return news_items
+
+    for li in news_section.select("ul.nav-symbol__news-list li"):
+        source_tag = li.find("span", class_="news-source")
+        publisher = source_tag.get("title") if source_tag else "Unknown"
+        time_tag = li.find("time")
+        try:
+            dt = datetime.strptime(time_tag["datetime"], "%Y-%m-%dT%H:%MZ").replace(tzinfo=ZoneInfo("UTC"))
+        except Exception:
+            continue
+
+        title_tag = li.find("span", class_="news-title").find("a")
+        if not title_tag:
+            continue
+
+        text = title_tag.get("title", title_tag.get_text(strip=True))
+        news_items.append({
+            "Date": dt,
+            "Ticker": ticker.upper(),
+            "link": f'<a href="{title_tag["href"]}" target="_blank">{text}</a>',
+            "publisher": publisher
+        })
+    return news_items
+
+
+# (fixture file pattern -> ticker, reference parser, current parser)
+PAGE_KINDS = [
+    (re.compile(r"investegate\.co\.uk_company_([^_]+)_"), lambda m: f"{m.group(1)}.L",
+     reference_parse_rns_page, mypowerBY.parse_rns_page),
+    (re.compile(r"mql5\.com_en_quotes_stocks_([^_.]+)"), lambda m: m.group(1),
+     reference_parse_mql5_page, mypowerBY.parse_mql5_page),
+]
+
+
+def measure(parse, page, ticker):
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        parse(page, ticker)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    result = parse(page, ticker)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, sorted(timings)[RUNS // 2], peak
+
+
+def main():
+    pages_dir = os.path.join(fixtures_dir, "pages")
+    names = sorted(os.listdir(pages_dir)) if os.path.isdir(pages_dir) else []
+    print(f"{'page':<60} {'rows':>5} {'bs4 ms':>8} {'lxml ms':>8} {'speed-up':>8} {'bs4 KB':>8} {'lxml KB':>8}")
+
+    for name in names:
+        for pattern, ticker_for, reference, current in PAGE_KINDS:
+            match = pattern.search(name)
+            if not match:
+                continue
+
+            with open(os.path.join(pages_dir, name), encoding="utf-8") as f:
+                page = f.read()
+            ticker = ticker_for(match)
+
+            expected, old_time, old_peak = measure(reference, page, ticker)
+            result, new_time, new_peak = measure(current, page, ticker)
+            status = "" if result == expected else "  MISMATCH"
+
+            print(f"{name[:60]:<60} {len(result):>5} {old_time * 1000:>8.2f} {new_time * 1000:>8.2f} "
+                  f"{old_time / new_time:>7.1f}x {old_peak / 1024:>8.0f} {new_peak / 1024:>8.0f}{status}")
+
+    if not names:
+        print(f"No recorded pages under {pages_dir} - run the app once with STOCKDASH_PROVIDER=record")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Times the Yahoo news relevance check in mypowerBY (RelevanceMatcher, an
+Aho-Corasick automaton over the company's keywords) against the substring
+checks it replaced, on generated articles.
+
+    python benchmarks/news_relevance.py [articles]
+
+"any-in" is the old filter (any(keyword in title + summary)); "substring
+score" computes the matcher's score with one `in` check per keyword; the
+matcher column is RelevanceMatcher.score.
+"""
+import os
+import random
+import sys
+import time
+
+os.environ["STOCKDASH_BACKGROUND_JOBS"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mypowerBY  # noqa: E402
+
+RUNS = 5
+WORDS = ("shares rose fell after results guidance dividend market investors analysts quarter revenue "
+         "profit outlook chief executive said deal talks regulator approval oil gas bank retail").split()
+
+# Company text as get_yahoo_news builds it (longname, shortname, sector, industry)
+COMPANIES = {
+    "few keywords": "BP p.l.c. BP PLC Energy Oil & Gas Integrated",
+    "many keywords": ("Anglo American Platinum Mining Resources Exploration plc AAPM Basic Materials "
+                      "Other Industrial Metals Mining Copper Nickel Diamonds Iron Ore Coal Manganese Holdings Group"),
+}
+
+
+def make_articles(count, keywords, seed=11):
+    rng = random.Random(seed)
+    articles = []
+    for _ in range(count):
+        words = rng.choices(WORDS, k=40)
+        if rng.random() < 0.3:
+            words[rng.randrange(len(words))] = rng.choice(keywords)
+        articles.append({"title": " ".join(words[:10]).title(), "summary": " ".join(words[10:])})
+    return articles
+
+
+def any_in(keywords, article):
+    text = (article["title"] + " " + article["summary"]).lower()
+    return any(keyword in text for keyword in keywords)
+
+
+def substring_score(keywords, article):
+    title, summary = article["title"].lower(), article["summary"].lower()
+    in_title = {keyword for keyword in keywords if keyword in title}
+    in_summary = {keyword for keyword in keywords if keyword in summary} - in_title
+    return (2 * len(in_title) + len(in_summary)) / (2 * len(keywords))
+
+
+def timed(fn, articles):
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        result = [fn(article) for article in articles]
+        timings.append(time.perf_counter() - started)
+    return result, sorted(timings)[RUNS // 2]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    print(f"{'company':<15} {'keywords':>8} {'any-in s':>9} {'substring score s':>18} {'matcher s':>10}")
+
+    for label, raw_text in COMPANIES.items():
+        matcher = mypowerBY.relevance_matcher(raw_text)
+        keywords = matcher.keywords
+        articles = make_articles(count, keywords)
+
+        kept, old_time = timed(lambda article: any_in(keywords, article), articles)
+        expected, score_time = timed(lambda article: substring_score(keywords, article), articles)
+        scores, matcher_time = timed(lambda article: matcher.score(article["title"], article["summary"]), articles)
+
+        status = "" if [s > 0 for s in scores] == kept and scores == expected else "  MISMATCH"
+        print(f"{label:<15} {len(keywords):>8} {old_time:>9.3f} {score_time:>18.3f} {matcher_time:>10.3f}{status}")
+
+
+if __name__ == "__main__":
+    main()
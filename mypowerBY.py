@@ -1,28 +1,48 @@
 import dash
 import dash_bootstrap_components as dbc
-from dash import html, dcc, Input, Output, State, ctx
+from dash import html, dcc, Input, Output, State, ctx, no_update, DiskcacheManager, ClientsideFunction
 import dash_ag_grid as dag
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import yfinance as yf
 import numpy as np
 import plotly.express as px
 import plotly.graph_objs as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
-from scipy.interpolate import make_interp_spline
+from scipy.signal import lfilter
 import dash_daq as daq
 import requests
+from requests.adapters import HTTPAdapter
+import random
 import re
+import hashlib
+import threading
+import time
+import io
+import zlib
+import zipfile
+import diskcache
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait, FIRST_COMPLETED
 
-from dash.dcc import Download, send_file
 import os
 
 from dash.exceptions import PreventUpdate
 from datetime import datetime
 import tzlocal
 import json
-
-from bs4 import BeautifulSoup
+import functools
+from abc import ABC, abstractmethod
+import ahocorasick
+import sqlite3
+from contextlib import closing
+from flask import jsonify, request, Response, abort, send_file, stream_with_context
+
+import lxml.html
 from zoneinfo import ZoneInfo
+from urllib.parse import urlsplit
+from email.utils import parsedate_to_datetime
 
 # ---------------------------------------------------
 # FTSE Sectors 
@@ -90,161 +110,1782 @@ uk_sector_indices = {
 }
 
 # ---------------------------------------------------
-# Sector ETF symbols (S&P 500 sectors)
+# Sector ETF symbols (S&P 500 sectors)
+# ---------------------------------------------------
+us_sector_indices = {
+    "Materials (XLB)": "XLB",
+    "Energy (XLE)": "XLE",
+    "Financials (XLF)": "XLF",
+    "Industrials (XLI)": "XLI",
+    "Technology (XLK)": "XLK",
+    "Consumer Staples (XLP)": "XLP",
+    "Utilities (XLU)": "XLU",
+    "Health Care (XLV)": "XLV",
+    "Consumer Discretionary (XLY)": "XLY",
+    "Real Estate (XLRE)": "XLRE",
+    "Communication Services (XLC)": "XLC"
+}
+
+metals_indices = {
+    "Gold": ["GC=F"],
+    "Silver": ["SI=F"],
+    "Platinum": ["PL=F"],
+    "Palladium": ["PA=F"],
+    "Copper": ["HG=F"]
+}
+
+crypto_indices = {
+    "Bitcoin": ["BTC-USD"],
+    "Ethereum": ["ETH-USD"],
+    "Solana": ["SOL-USD"],
+    "Binance Coin": ["BNB-USD"],
+    "XRP": ["XRP-USD"]
+}
+
+
+# Load data
+DATA_ROOT = "data/Exchange"
+CACHE_ROOT = os.environ.get("STOCKDASH_CACHE", "data/.cache")
+
+
+# ---------------------------------------------------
+# Columnar snapshot cache
+# ---------------------------------------------------
+SNAPSHOT_CACHE_DIR = os.path.join(CACHE_ROOT, "snapshots")
+SNAPSHOT_CACHE_SCHEMA = 3   # bump whenever normalise_snapshot_dtypes / normalise_batch_schema change
+
+
+def normalise_snapshot_dtypes(df):
+    df.columns = df.columns.str.strip()
+
+    for col in df.columns[df.dtypes == object]:
+        values = df[col].str.strip()
+        numeric = pd.to_numeric(values, errors="coerce")
+
+        # Only promote columns that are numeric all the way down
+        if numeric.notna().sum() == values.notna().sum():
+            df[col] = numeric
+        else:
+            df[col] = values
+
+    return df
+
+
+# BATCH columns that may carry the "UNKNOWN" sentinel - parsed to NaN
+BATCH_NUMERIC_COLUMNS = [
+    "Avg Hold Period(days)", "last Price", "Total Profit", "Avg Volume", "Volume Indicator",
+    "Beta Risk", "Num of Trades", "Dropped Samples %", "Ask-Bid Spread", "Peg Ratio", "Pegy",
+]
+BATCH_CATEGORY_COLUMNS = ["Sector", "Industry"]
+# Grid columnDefs entry that shows those NaNs (null in the rowData) as UNKNOWN again;
+# rows the infinite row model is still loading have no data and stay blank
+UNKNOWN_FORMATTER = {"valueFormatter": {"function": "params.data && params.value == null ? 'UNKNOWN' : params.value"}}
+# "low - high" strings, kept for display and split into "<col> Low" / "<col> High"
+BATCH_RANGE_COLUMNS = ["BUY Range", "SELL Range", "Price Movement"]
+
+
+def normalise_batch_schema(df):
+    """
+    Types a BATCH snapshot once at ingest so callbacks only compare clean dtypes.
+    """
+    for col in BATCH_NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+
+    for col in BATCH_CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
+    for col in BATCH_RANGE_COLUMNS:
+        if col in df.columns:
+            bounds = df[col].astype(str).str.extract(r'^\s*(-?[\d.]+)\s*-\s*(-?[\d.]+)\s*$')
+            df[f"{col} Low"] = pd.to_numeric(bounds[0], errors="coerce")
+            df[f"{col} High"] = pd.to_numeric(bounds[1], errors="coerce")
+
+    return df
+
+
+def snapshot_cache_path(csv_path):
+    name = os.path.splitext(os.path.relpath(csv_path, DATA_ROOT))[0].replace(os.sep, "_")
+    return os.path.join(SNAPSHOT_CACHE_DIR, f"{name}.arrow")
+
+
+def read_snapshot(csv_path, encoding='ISO-8859-1', schema=None):
+    """
+    Returns a snapshot CSV as a DataFrame. The parsed frame is kept as an Arrow
+    IPC file and memory-mapped back while the CSV's mtime/size are unchanged.
+    schema is an optional extra typing pass (e.g. normalise_batch_schema).
+    """
+    stat = os.stat(csv_path)
+    schema_name = schema.__name__ if schema else "raw"
+    source_key = f"{SNAPSHOT_CACHE_SCHEMA}:{schema_name}:{stat.st_mtime_ns}:{stat.st_size}".encode()
+    cache_path = snapshot_cache_path(csv_path)
+
+    try:
+        with pa.memory_map(cache_path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+            if (table.schema.metadata or {}).get(b"stockdash_source") == source_key:
+                return table.to_pandas()
+    except (OSError, pa.ArrowInvalid):
+        pass  # No cache yet, or a half-written one
+
+    df = normalise_snapshot_dtypes(pd.read_csv(csv_path, encoding=encoding, low_memory=False))
+    if schema:
+        df = schema(df)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"stockdash_source": source_key})
+
+    # Write then rename so other workers never map a partial file
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(SNAPSHOT_CACHE_DIR, exist_ok=True)
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"⚠ Could not write snapshot cache {cache_path}: {e}")
+
+    return table.to_pandas()
+
+
+# ---------------------------------------------------
+# HTTP client
+# ---------------------------------------------------
+# One keep-alive session for every Yahoo / Investegate / MQL5 request, with a
+# connection pool per host. 429s and 5xx are retried with jittered exponential
+# backoff; a host that keeps failing trips its circuit breaker, and requests
+# to it then fail at once until HTTP_BREAKER_COOLDOWN has passed, instead of
+# each one waiting out its timeouts on a Dash worker.
+HTTP_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
+HTTP_TIMEOUT = (3.05, 10)   # (connect, read) seconds; a hung site must not hold a fetch worker
+HTTP_POOL_HOSTS = 8         # hosts with a kept-alive pool
+HTTP_POOL_SIZE = 8          # connections kept per host (the fetch pool and crawler share them)
+HTTP_RETRIES = 2            # retries after the first attempt
+HTTP_DEADLINE = 8           # seconds for a whole http_get, retries and waits included (the longest news source timeout)
+HTTP_RETRY_STATUSES = {429, 500, 502, 503, 504}
+HTTP_BACKOFF = 0.5          # seconds, doubled per retry, capped by HTTP_BACKOFF_MAX
+HTTP_BACKOFF_MAX = 4
+HTTP_BREAKER_FAILURES = 5   # consecutive failed attempts that open a host's circuit
+HTTP_BREAKER_COOLDOWN = 60  # seconds before a trial request is let through again
+
+http_session = None
+http_session_pid = None
+http_session_lock = threading.Lock()
+
+http_circuits = {}
+http_circuits_lock = threading.Lock()
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """
+    Raised without any network call while a host's circuit breaker is open.
+    """
+
+
+def get_http_session():
+    global http_session, http_session_pid
+
+    # Like the fetch pool, forked background jobs must not share the parent's sockets
+    if http_session_pid != os.getpid():
+        with http_session_lock:
+            if http_session_pid != os.getpid():
+                session = requests.Session()
+                session.headers.update(HTTP_HEADERS)
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                http_session = session
+                http_session_pid = os.getpid()
+    return http_session
+
+
+def circuit_allows(host):
+    """
+    False while host's circuit is open. Once the cooldown is over the circuit
+    is half-open: one trial request goes through and the cooldown restarts, so
+    a still-dead host costs one timeout per cooldown rather than one per call.
+    """
+    with http_circuits_lock:
+        circuit = http_circuits.get(host)
+        if not circuit or circuit["failures"] < HTTP_BREAKER_FAILURES:
+            return True
+        if time.monotonic() < circuit["open_until"]:
+            return False
+        circuit["open_until"] = time.monotonic() + HTTP_BREAKER_COOLDOWN
+        return True
+
+
+def record_http_result(host, ok):
+    with http_circuits_lock:
+        if ok:
+            http_circuits.pop(host, None)
+            return
+
+        circuit = http_circuits.setdefault(host, {"failures": 0, "open_until": 0})
+        circuit["failures"] += 1
+        if circuit["failures"] == HTTP_BREAKER_FAILURES:
+            circuit["open_until"] = time.monotonic() + HTTP_BREAKER_COOLDOWN
+            print(f"⚠ {host} failed {HTTP_BREAKER_FAILURES} times in a row, pausing requests for {HTTP_BREAKER_COOLDOWN}s")
+
+
+def retry_delay(attempt, response=None):
+    """
+    Seconds to wait before the next attempt, or None if the server's
+    Retry-After asks for longer than HTTP_BACKOFF_MAX (not worth holding a
+    worker for, so the response is handed back instead).
+    """
+    # Full jitter, so workers that failed together do not retry together
+    delay = random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF * 2 ** attempt))
+
+    retry_after = response.headers.get("Retry-After", "").strip() if response is not None else ""
+    if retry_after.isdigit():
+        wait_for = int(retry_after)
+    elif retry_after:
+        try:
+            wait_for = (parsedate_to_datetime(retry_after) - datetime.now(UTC)).total_seconds()
+        except (TypeError, ValueError):
+            wait_for = 0
+    else:
+        wait_for = 0
+
+    if wait_for > HTTP_BACKOFF_MAX:
+        return None
+    return max(delay, wait_for)
+
+
+def http_get(url, params=None, headers=None, timeout=HTTP_TIMEOUT, deadline=HTTP_DEADLINE):
+    """
+    requests.get over the shared session, with retries and the host's circuit
+    breaker. Raises CircuitOpenError if the host is being skipped; if every
+    attempt got a 429/5xx, the last response is returned for the caller to
+    handle like any other status.
+
+    deadline bounds the whole call: each attempt's timeouts are cut to the
+    time left, and no retry starts once it is spent, so a hung host costs a
+    fetch worker at most deadline seconds.
+    """
+    host = urlsplit(url).netloc
+    session = get_http_session()
+    give_up = time.monotonic() + deadline
+
+    for attempt in range(HTTP_RETRIES + 1):
+        if not circuit_allows(host):
+            raise CircuitOpenError(f"{host} is not responding, skipped {url}")
+
+        left = max(give_up - time.monotonic(), 0.1)
+        try:
+            response = session.get(url, params=params, headers=headers,
+                                   timeout=tuple(min(limit, left) for limit in timeout))
+        except (requests.ConnectionError, requests.Timeout):
+            record_http_result(host, ok=False)
+            if attempt == HTTP_RETRIES or time.monotonic() >= give_up:
+                raise
+            response = None
+        else:
+            retryable = response.status_code in HTTP_RETRY_STATUSES
+            record_http_result(host, ok=not retryable)
+            if not retryable or attempt == HTTP_RETRIES:
+                return response
+
+        delay = retry_delay(attempt, response)
+        if delay is None or time.monotonic() + delay >= give_up:
+            if response is None:
+                raise requests.Timeout(f"{url}: gave up after {deadline}s")
+            return response
+        time.sleep(delay)
+
+
+# ---------------------------------------------------
+# Market-data providers
+# ---------------------------------------------------
+# Every upstream fetch (prices, quote info, Yahoo search, scraped news pages)
+# goes through market_data_provider. STOCKDASH_PROVIDER picks the backend:
+#   yfinance - live Yahoo / Investegate / MQL5 (default)
+#   record   - live, and also saves everything under STOCKDASH_FIXTURES
+#   replay   - serves only what was recorded, no network at all
+YAHOO_SEARCH_URL = "https://query2.finance.yahoo.com/v1/finance/search"
+
+
+def fixture_name(text):
+    return re.sub(r'[^\w.=^-]+', '_', text)[:150]
+
+
+def search_fixture_name(query, params):
+    # quotes_count / news_count change the response, so they are part of the recording's name
+    return fixture_name(query + "".join(f"&{key}={value}" for key, value in sorted(params.items())))
+
+
+class MarketDataProvider(ABC):
+
+    @abstractmethod
+    def download(self, tickers, start, interval="1d"):
+        """
+        Unadjusted OHLCV bars from start, shaped like yf.download(..., auto_adjust=False)
+        with (Price, Ticker) MultiIndex columns.
+        """
+
+    @abstractmethod
+    def ticker_info(self, symbols):
+        """
+        Returns {symbol: Yahoo quote info dict}; symbols that fail are left out.
+        """
+
+    @abstractmethod
+    def search(self, query, **params):
+        """
+        Returns the Yahoo finance search JSON (quotes + news) for query.
+        """
+
+    @abstractmethod
+    def fetch_page(self, url):
+        """
+        Returns the HTML of a news page, raising if it could not be fetched.
+        """
+
+    def revalidate_page(self, url, etag=None, last_modified=None):
+        """
+        Conditional fetch_page. Returns (html, etag, last_modified); html is
+        None if the page is unchanged since those validators were issued.
+        """
+        return self.fetch_page(url), None, None
+
+
+class YFinanceProvider(MarketDataProvider):
+
+    def download(self, tickers, start, interval="1d"):
+        return yf.download(list(tickers), start=start, interval=interval, auto_adjust=False, progress=False, threads=True)
+
+    def ticker_info(self, symbols):
+        tickers = yf.Tickers(" ".join(symbols)).tickers
+        infos = {}
+        for symbol in symbols:
+            try:
+                infos[symbol] = tickers[symbol].info
+            except Exception as e:
+                print(f"⚠️ Error fetching info for {symbol}: {e}")
+        return infos
+
+    def search(self, query, **params):
+        response = http_get(YAHOO_SEARCH_URL, params={"q": query, **params})
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_page(self, url):
+        html_text, _, _ = self.revalidate_page(url)
+        return html_text
+
+    def revalidate_page(self, url, etag=None, last_modified=None):
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        response = http_get(url, headers=headers)
+        if response.status_code == 304:
+            return None, etag, last_modified
+        if response.status_code != 200:
+            raise Exception(f"Failed to fetch {url}. Status code: {response.status_code}")
+        return response.text, response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Serves recorded fixtures from a local directory:
+        bars/<interval>/<TICKER>.csv    info/<TICKER>.json
+        search/<query>.json              pages/<url>.html
+    """
+
+    def __init__(self, fixtures_dir):
+        self.fixtures_dir = fixtures_dir
+
+    def path(self, *parts):
+        return os.path.join(self.fixtures_dir, *parts)
+
+    def read_bars(self, ticker, interval):
+        path = self.path("bars", interval, f"{fixture_name(ticker)}.csv")
+        if not os.path.exists(path):
+            return pd.DataFrame()
+        return pd.read_csv(path, index_col="Date", parse_dates=["Date"])
+
+    def download(self, tickers, start, interval="1d"):
+        start = pd.Timestamp(start)
+        frames = {}
+        for ticker in tickers:
+            bars = self.read_bars(ticker, interval)
+            if not bars.empty:
+                frames[ticker] = bars[bars.index >= start]
+
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1).swaplevel(axis=1).sort_index(axis=1)
+
+    def ticker_info(self, symbols):
+        infos = {}
+        for symbol in symbols:
+            path = self.path("info", f"{fixture_name(symbol)}.json")
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    infos[symbol] = json.load(f)
+        return infos
+
+    def search(self, query, **params):
+        path = self.path("search", f"{search_fixture_name(query, params)}.json")
+        if not os.path.exists(path):
+            return {"quotes": [], "news": []}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def fetch_page(self, url):
+        path = self.path("pages", f"{fixture_name(url)}.html")
+        if not os.path.exists(path):
+            raise Exception(f"No recorded page for {url}")
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+
+class RecordingProvider(YFinanceProvider):
+    """
+    Live provider that also writes every response in the ReplayProvider layout.
+    """
+
+    def __init__(self, fixtures_dir):
+        self.replay = ReplayProvider(fixtures_dir)
+
+    def save(self, content, *parts):
+        path = self.replay.path(*parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def download(self, tickers, start, interval="1d"):
+        data = super().download(tickers, start, interval)
+        if isinstance(data.columns, pd.MultiIndex):
+            for ticker in data.columns.get_level_values(1).unique():
+                bars = data.xs(ticker, axis=1, level=1).dropna(how="all")
+                recorded = self.replay.read_bars(ticker, interval)
+                if not recorded.empty:
+                    bars = pd.concat([recorded[recorded.index < bars.index.min()], bars]) if not bars.empty else recorded
+                bars.index.name = "Date"
+                self.save(bars.to_csv(), "bars", interval, f"{fixture_name(ticker)}.csv")
+        return data
+
+    def ticker_info(self, symbols):
+        infos = super().ticker_info(symbols)
+        for symbol, info in infos.items():
+            self.save(json.dumps(info, default=str), "info", f"{fixture_name(symbol)}.json")
+        return infos
+
+    def search(self, query, **params):
+        data = super().search(query, **params)
+        self.save(json.dumps(data), "search", f"{search_fixture_name(query, params)}.json")
+        return data
+
+    def revalidate_page(self, url, etag=None, last_modified=None):
+        html_text, etag, last_modified = super().revalidate_page(url, etag, last_modified)
+        if html_text is not None:
+            self.save(html_text, "pages", f"{fixture_name(url)}.html")
+        return html_text, etag, last_modified
+
+
+def make_market_data_provider():
+    provider = os.environ.get("STOCKDASH_PROVIDER", "yfinance").lower()
+    fixtures_dir = os.environ.get("STOCKDASH_FIXTURES", "data/fixtures")
+
+    if provider == "replay":
+        return ReplayProvider(fixtures_dir)
+    if provider == "record":
+        return RecordingProvider(fixtures_dir)
+    return YFinanceProvider()
+
+
+market_data_provider = make_market_data_provider()
+
+
+# ---------------------------------------------------
+# Concurrent fetches
+# ---------------------------------------------------
+# Independent upstream calls made by one callback run side by side on a
+# bounded pool, each with its own deadline measured from submission. Tasks
+# submitted here must not submit to the pool themselves.
+FETCH_WORKERS = int(os.environ.get("STOCKDASH_FETCH_WORKERS", "8"))
+NEWS_FETCH_DEADLINE = 8   # hard cap on the whole news fetch
+
+fetch_executor = None
+fetch_executor_pid = None
+fetch_executor_lock = threading.Lock()
+
+
+def get_fetch_executor():
+    global fetch_executor, fetch_executor_pid
+
+    # Background callback jobs run in forked processes, where the parent's pool threads do not exist
+    if fetch_executor_pid != os.getpid():
+        with fetch_executor_lock:
+            if fetch_executor_pid != os.getpid():
+                fetch_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="stockdash-fetch")
+                fetch_executor_pid = os.getpid()
+    return fetch_executor
+
+
+def fetch_concurrently(tasks):
+    """
+    Runs {name: (fn, deadline_seconds)} on the fetch pool. Returns
+    (results, errors): errors maps a task name to its exception, or to a
+    FutureTimeoutError if it missed its deadline (the task is then
+    abandoned, and cancelled if it had not started yet).
+    """
+    started = time.monotonic()
+    executor = get_fetch_executor()
+    futures = {name: (executor.submit(fn), deadline) for name, (fn, deadline) in tasks.items()}
+    results, errors = {}, {}
+
+    for name, (future, deadline) in futures.items():
+        try:
+            results[name] = future.result(timeout=max(0, started + deadline - time.monotonic()))
+        except FutureTimeoutError as e:
+            future.cancel()
+            print(f"⚠ {name} fetch missed its {deadline}s deadline")
+            errors[name] = e
+        except Exception as e:
+            errors[name] = e
+
+    return results, errors
+
+
+# ---------------------------------------------------
+# Indicator engine
+# ---------------------------------------------------
+# One implementation of every technical indicator, used by all pages. Inputs
+# are 1-D (time) or 2-D (series x time) arrays; time is always the last axis,
+# so a whole universe is computed in one pass.
+#
+# Warm-up semantics:
+#   - leading NaNs are a series that has not started yet and stay NaN;
+#     gaps after the first value are forward-filled
+#   - EMAs (and so MACD) are seeded on each series' first value
+#   - SMA is NaN until `window` values have been seen, RSI until `period`
+#     price changes have been seen
+# Compute on the full history and slice afterwards, so the warm-up falls
+# outside what is displayed.
+def prepare_indicator_input(values):
+    """
+    Returns (filled, leading, first_valid): values forward-filled along time
+    with leading NaNs set to each series' first value, the mask of those
+    leading positions, and the index of each series' first value.
+    """
+    values = np.array(values, dtype=float)
+    valid = ~np.isnan(values)
+    positions = np.arange(values.shape[-1])
+
+    if valid.all():
+        return values, np.zeros(values.shape, dtype=bool), np.zeros(values.shape[:-1], dtype=int)
+
+    last_valid = np.maximum.accumulate(np.where(valid, positions, 0), axis=-1)
+    filled = np.take_along_axis(values, last_valid, axis=-1)
+
+    first_valid = valid.argmax(axis=-1)
+    leading = positions < np.expand_dims(first_valid, -1)
+    first_value = np.take_along_axis(values, np.expand_dims(first_valid, -1), axis=-1)
+    filled = np.where(leading, first_value, filled)
+
+    return filled, leading, first_valid
+
+
+def exponential_smooth(filled, alpha):
+    # y[t] = alpha * x[t] + (1 - alpha) * y[t-1], seeded with y[0] = x[0]
+    initial = (1.0 - alpha) * filled[..., :1]
+    smoothed, _ = lfilter([alpha], [1.0, alpha - 1.0], filled, axis=-1, zi=initial)
+    return smoothed
+
+
+def ema(values, span):
+    """
+    Exponential moving average (pandas ewm(span, adjust=False)).
+    """
+    filled, leading, _ = prepare_indicator_input(values)
+
+    smoothed = exponential_smooth(filled, 2.0 / (span + 1.0))
+    smoothed[leading] = np.nan
+    return smoothed
+
+
+def sma(values, window):
+    filled, leading, first_valid = prepare_indicator_input(values)
+
+    totals = np.cumsum(np.where(leading, 0.0, filled), axis=-1)
+    shifted = np.zeros_like(totals)
+    shifted[..., window:] = totals[..., :-window]
+    averages = (totals - shifted) / window
+
+    seen = np.arange(filled.shape[-1]) - np.expand_dims(first_valid, -1)
+    averages[seen < window - 1] = np.nan
+    return averages
+
+
+def wilder_averages(values, period=14):
+    """
+    Returns (avg_gain, avg_loss, first_valid): the gains/losses behind rsi,
+    smoothed with alpha = 1/period, and each series' first valid index.
+    """
+    filled, leading, first_valid = prepare_indicator_input(values)
+
+    # The first price change seeds the averages: every delta up to it is set to it
+    delta = np.diff(filled, axis=-1, prepend=filled[..., :1])
+    seed_at = np.expand_dims(np.minimum(first_valid + 1, filled.shape[-1] - 1), -1)
+    positions = np.arange(filled.shape[-1])
+    delta = np.where(positions < seed_at, np.take_along_axis(delta, seed_at, axis=-1), delta)
+
+    avg_gain = exponential_smooth(np.clip(delta, 0, None), 1.0 / period)
+    avg_loss = exponential_smooth(np.clip(-delta, 0, None), 1.0 / period)
+    return avg_gain, avg_loss, first_valid
+
+
+def rsi(values, period=14):
+    """
+    Wilder's RSI (gains/losses smoothed with alpha = 1/period).
+    """
+    avg_gain, avg_loss, first_valid = wilder_averages(values, period)
+    positions = np.arange(avg_gain.shape[-1])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        strength = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    flat = avg_loss == 0
+    strength[flat] = np.where(avg_gain[flat] == 0, 50.0, 100.0)
+
+    strength[positions - np.expand_dims(first_valid, -1) < period] = np.nan
+    return strength
+
+
+def macd(values, fast=12, slow=26, signal=9):
+    """
+    Returns (macd_line, signal_line, histogram).
+    """
+    filled, leading, _ = prepare_indicator_input(values)
+
+    macd_line = exponential_smooth(filled, 2.0 / (fast + 1.0)) - exponential_smooth(filled, 2.0 / (slow + 1.0))
+    signal_line = exponential_smooth(macd_line, 2.0 / (signal + 1.0))
+    histogram = macd_line - signal_line
+
+    for line in (macd_line, signal_line, histogram):
+        line[leading] = np.nan
+    return macd_line, signal_line, histogram
+
+
+def zscore(values):
+    values = np.asarray(values, dtype=float)
+    mean = np.nanmean(values, axis=-1, keepdims=True)
+    std = np.nanstd(values, axis=-1, ddof=1, keepdims=True)
+    return (values - mean) / (std + 1e-9)
+
+
+# ---------------------------------------------------
+# Figure building
+# ---------------------------------------------------
+# Keeps figure payloads small:
+#   - line traces are LTTB-downsampled to about one point per pixel column,
+#     few enough that SVG scatter stays fast (no WebGL needed)
+#   - dates are sent as epoch milliseconds (float64), so x and y both go
+#     out as base64 typed arrays instead of lists of ISO strings
+#   - constant lines are layout shapes, not traces
+#   - figures use a template stripped down to the cartesian settings
+#     (the stock plotly template is ~9 KB per figure)
+FIGURE_MAX_POINTS = 1000
+
+COMPACT_TEMPLATE = go.layout.Template(
+    layout={key: value for key, value in pio.templates["plotly"].layout.to_plotly_json().items()
+            if key not in ("polar", "ternary", "coloraxis", "scene", "geo", "mapbox")},
+    data={key: value for key, value in pio.templates["plotly"].data.to_plotly_json().items()
+          if key in ("scatter", "scattergl", "bar", "heatmap")},
+)
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: indices of the threshold points that best keep the line's shape.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    indices = [0]
+    anchor = 0
+
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start = end
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[next_start:next_end].mean()
+        next_y = np.nanmean(y[next_start:next_end]) if np.isfinite(y[next_start:next_end]).any() else y[anchor]
+
+        areas = np.abs((x[anchor] - next_x) * (y[start:end] - y[anchor]) -
+                       (x[anchor] - x[start:end]) * (next_y - y[anchor]))
+        anchor = start + int(np.argmax(np.nan_to_num(areas, nan=-1.0)))
+        indices.append(anchor)
+
+    indices.append(n - 1)
+    return np.asarray(indices)
+
+
+def compact_x(x):
+    """
+    Returns (values, is_date) - datetimes become epoch milliseconds.
+    """
+    if pd.api.types.is_datetime64_any_dtype(x):
+        stamps = pd.DatetimeIndex(x)
+        if stamps.tz is not None:
+            stamps = stamps.tz_convert(None)
+        return stamps.asi8 / 1e6, True
+    return np.asarray(x, dtype=float), False
+
+
+def line_trace(x, y, max_points=FIGURE_MAX_POINTS, **kwargs):
+    """
+    go.Scatter with downsampled, typed-array x/y.
+    Figures using date x values need compact_figure(fig, date_axis=True).
+    """
+    x_values, _ = compact_x(x)
+    y_values = np.asarray(y, dtype=float)
+
+    if len(x_values) > max_points:
+        keep = lttb_indices(x_values, y_values, max_points)
+        x_values, y_values = x_values[keep], y_values[keep]
+
+    return go.Scatter(x=x_values, y=y_values, **kwargs)
+
+
+def compact_figure(fig, date_axis=True):
+    fig.update_layout(template=COMPACT_TEMPLATE)
+    if date_axis:
+        fig.update_xaxes(type="date")
+    return fig
+
+
+# ---------------------------------------------------
+# Local OHLCV bar store
+# ---------------------------------------------------
+# One Parquet file per ticker and interval under data/.cache/bars. Bars are
+# stored unadjusted (with Adj Close) so both auto_adjust modes can be served,
+# and only the tail after the last stored bar is fetched from Yahoo.
+BAR_STORE_DIR = os.path.join(CACHE_ROOT, "bars")
+BAR_STORE_MAX_AGE = 15 * 60   # seconds before a stored series is topped up again
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+BAR_DOWNLOAD_CHUNK = 100      # tickers per yf.download request
+
+PERIOD_OFFSETS = {
+    "5d": pd.DateOffset(days=5),
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+}
+
+bar_store_lock = threading.Lock()
+
+
+def empty_bars():
+    return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], name="Date"), dtype="float64")
+
+
+def period_start(period):
+    return pd.Timestamp.now().normalize() - PERIOD_OFFSETS[period]
+
+
+def bar_store_path(ticker, interval):
+    safe_ticker = re.sub(r'[^\w.=^-]', '_', ticker.upper())
+    return os.path.join(BAR_STORE_DIR, interval, f"{safe_ticker}.parquet")
+
+
+def read_bar_store(ticker, interval):
+    """
+    Returns (bars, covers_from, age_seconds) - bars is empty if nothing is stored.
+    """
+    path = bar_store_path(ticker, interval)
+    try:
+        table = pq.read_table(path)
+        age = time.time() - os.path.getmtime(path)
+    except (OSError, pa.ArrowInvalid):
+        return empty_bars(), None, None
+
+    covers_from = (table.schema.metadata or {}).get(b"covers_from")
+    covers_from = pd.Timestamp(covers_from.decode()) if covers_from else None
+    return table.to_pandas(), covers_from, age
+
+
+def write_bar_store(ticker, interval, bars, covers_from):
+    path = bar_store_path(ticker, interval)
+    table = pa.Table.from_pandas(bars.reindex(columns=BAR_COLUMNS).astype("float64"))
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"covers_from": covers_from.isoformat().encode()})
+
+    # Write then rename so readers never see a partial file
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠ Could not write bar store {path}: {e}")
+
+
+def history_rewritten(stored, fetched):
+    # Dividends and splits rewrite past bars - compare the overlapping bars
+    overlap = fetched.index.intersection(stored.index)
+    if overlap.empty:
+        return False
+
+    old, new = stored.loc[overlap], fetched.loc[overlap]
+    adj_drift = ((new["Adj Close"] / new["Close"]) / (old["Adj Close"] / old["Close"]) - 1).abs()
+    split_ratio = new["Close"] / old["Close"]
+    return bool((adj_drift > 1e-4).any() or ((split_ratio > 1.5) | (split_ratio < 1 / 1.5)).any())
+
+
+def fetch_bars(tickers, start, interval):
+    """
+    Downloads unadjusted bars from start for every ticker in multi-ticker requests.
+    Returns {ticker: bars}; tickers without data map to an empty frame.
+    """
+    fetched = {}
+    for i in range(0, len(tickers), BAR_DOWNLOAD_CHUNK):
+        chunk = tickers[i:i + BAR_DOWNLOAD_CHUNK]
+        data = market_data_provider.download(chunk, start, interval)
+
+        for ticker in chunk:
+            if data.empty:
+                bars = empty_bars()
+            elif isinstance(data.columns, pd.MultiIndex):
+                if ticker in data.columns.get_level_values(1):
+                    bars = data.xs(ticker, axis=1, level=1)
+                else:
+                    bars = empty_bars()
+            else:
+                bars = data
+
+            bars = bars.reindex(columns=BAR_COLUMNS).dropna(how="all")
+            if isinstance(bars.index, pd.DatetimeIndex) and bars.index.tz is not None:
+                bars.index = bars.index.tz_localize(None)
+            bars.index.name = "Date"
+            fetched[ticker] = bars
+
+    return fetched
+
+
+def update_bar_store(tickers, start, interval="1d"):
+    """
+    Brings the stored bars for every ticker up to date back to start, fetching
+    only what is missing. Tickers that share a fetch start go out together.
+    """
+    start = pd.Timestamp(start).normalize()
+    plan = {}
+
+    for ticker in tickers:
+        stored, covers_from, age = read_bar_store(ticker, interval)
+        if covers_from is None or covers_from > start:
+            plan.setdefault(start, []).append(ticker)
+        elif age > BAR_STORE_MAX_AGE:
+            fetch_from = stored.index[-1].normalize() if not stored.empty else start
+            plan.setdefault(fetch_from, []).append(ticker)
+
+    refetch = []
+    for fetch_from, group in plan.items():
+        for ticker, fetched in fetch_bars(group, fetch_from, interval).items():
+            with bar_store_lock:
+                stored, covers_from, _ = read_bar_store(ticker, interval)
+
+                if not stored.empty and not fetched.empty and history_rewritten(stored, fetched):
+                    refetch.append(ticker)
+                    continue
+
+                # yf.download reports network errors and rate limits as an empty frame, so
+                # nothing fetched never counts as coverage: an empty store stays unwritten,
+                # and a stored one keeps its covers_from (only its age is refreshed)
+                if fetched.empty:
+                    if not stored.empty:
+                        write_bar_store(ticker, interval, stored, covers_from)
+                    continue
+
+                if stored.empty:
+                    bars = fetched
+                else:
+                    bars = pd.concat([stored[stored.index < fetched.index[0]], fetched])
+
+                covers_from = min(covers_from, fetch_from) if covers_from is not None else fetch_from
+                write_bar_store(ticker, interval, bars, covers_from)
+
+    # Re-download the full window for anything a dividend or split invalidated
+    if refetch:
+        for ticker, fetched in fetch_bars(refetch, start, interval).items():
+            if fetched.empty:
+                continue
+            with bar_store_lock:
+                write_bar_store(ticker, interval, fetched, start)
+
+
+def get_price_history(ticker, period="1y", interval="1d", start=None, end=None, auto_adjust=False):
+    """
+    Drop-in for yf.download() on a single ticker, served from the local bar
+    store. Returns flat OHLCV columns indexed by Date.
+    """
+    start = pd.Timestamp(start) if start is not None else period_start(period)
+    update_bar_store([ticker], start, interval)
+
+    bars, _, _ = read_bar_store(ticker, interval)
+    bars = bars[bars.index >= start]
+    if end is not None:
+        bars = bars[bars.index < pd.Timestamp(end)]
+
+    if auto_adjust:
+        ratio = bars["Adj Close"] / bars["Close"]
+        bars = bars.assign(**{col: bars[col] * ratio for col in ["Open", "High", "Low", "Close"]})
+        bars = bars.drop(columns="Adj Close")
+
+    bars.index.name = "Date"
+    return bars
+
+
+# ---------------------------------------------------
+# Streaming chart indicators
+# ---------------------------------------------------
+# The single-ticker charts keep their indicator series (and the recursive
+# state behind them) in a sidecar next to the bar store file, so a refresh
+# only advances the state over bars it has not seen. The state is saved as
+# of the second-to-last bar: the latest bar may still be forming, so it is
+# recomputed from the saved state on every call instead.
+#
+# The indicator engine stays the one definition: a ticker's series and its
+# starting state are built with ema / rsi / macd over the stored history,
+# and StreamingIndicators only steps that state over bars added later.
+INDICATOR_STATE_VERSION = 1
+INDICATOR_COLUMNS = ["EMA_10", "EMA_30", "RSI", "MACD", "Signal Line", "MACD Histogram"]
+
+
+class StreamingIndicators:
+    """
+    EMA 10/30, RSI 14 (Wilder) and MACD 12/26/9 advanced one bar at a time,
+    with the same seeding and warm-up as the indicator engine.
+    """
+
+    RSI_PERIOD = 14
+    SPANS = {"ema_10": 10, "ema_30": 30, "ema_12": 12, "ema_26": 26, "signal": 9}
+
+    def __init__(self, state=None):
+        self.state = dict(state or {})
+
+    @classmethod
+    def from_history(cls, closes):
+        """
+        Computes INDICATOR_COLUMNS for closes with the indicator engine and
+        returns (rows, StreamingIndicators holding the state after the last bar).
+        """
+        closes = np.asarray(closes, dtype=float)
+        spans = cls.SPANS
+        if not len(closes) or np.isnan(closes).all():
+            return np.full((len(closes), len(INDICATOR_COLUMNS)), np.nan), cls()
+
+        ema_10, ema_30 = ema(closes, spans["ema_10"]), ema(closes, spans["ema_30"])
+        ema_12, ema_26 = ema(closes, spans["ema_12"]), ema(closes, spans["ema_26"])
+        macd_line, signal_line, histogram = macd(closes, spans["ema_12"], spans["ema_26"], spans["signal"])
+        rows = np.column_stack([ema_10, ema_30, rsi(closes, cls.RSI_PERIOD), macd_line, signal_line, histogram])
+
+        avg_gain, avg_loss, first_valid = wilder_averages(closes, cls.RSI_PERIOD)
+        changes = int(len(closes) - 1 - first_valid)
+        filled, _, _ = prepare_indicator_input(closes)
+        state = {
+            "close": float(filled[-1]), "changes": changes,
+            "avg_gain": float(avg_gain[-1]) if changes else None,
+            "avg_loss": float(avg_loss[-1]) if changes else None,
+            "ema_10": float(ema_10[-1]), "ema_30": float(ema_30[-1]),
+            "ema_12": float(ema_12[-1]), "ema_26": float(ema_26[-1]),
+            "signal": float(signal_line[-1]),
+        }
+        return rows, cls(state)
+
+    def update(self, closes):
+        """
+        Advances the state over closes and returns one row of INDICATOR_COLUMNS per bar.
+        """
+        state = self.state
+        alphas = {name: 2.0 / (span + 1.0) for name, span in self.SPANS.items()}
+        rsi_alpha = 1.0 / self.RSI_PERIOD
+        rows = []
+
+        for close in closes:
+            close = float(close)
+
+            if np.isnan(close):
+                if not state:
+                    rows.append([np.nan] * len(INDICATOR_COLUMNS))  # Series has not started yet
+                    continue
+                close = state["close"]  # Gap - carry the last close forward
+
+            if not state:
+                state.update(close=close, changes=0, avg_gain=None, avg_loss=None,
+                             ema_10=close, ema_30=close, ema_12=close, ema_26=close, signal=0.0)
+            else:
+                delta = close - state["close"]
+                gain, loss = max(delta, 0.0), max(-delta, 0.0)
+                if state["avg_gain"] is None:
+                    state["avg_gain"], state["avg_loss"] = gain, loss
+                else:
+                    state["avg_gain"] += rsi_alpha * (gain - state["avg_gain"])
+                    state["avg_loss"] += rsi_alpha * (loss - state["avg_loss"])
+                state["changes"] += 1
+                state["close"] = close
+
+                for name in ("ema_10", "ema_30", "ema_12", "ema_26"):
+                    state[name] += alphas[name] * (close - state[name])
+                state["signal"] += alphas["signal"] * (state["ema_12"] - state["ema_26"] - state["signal"])
+
+            macd_line = state["ema_12"] - state["ema_26"]
+
+            if state["changes"] < self.RSI_PERIOD:
+                strength = np.nan
+            elif state["avg_loss"] == 0:
+                strength = 50.0 if state["avg_gain"] == 0 else 100.0
+            else:
+                strength = 100.0 - 100.0 / (1.0 + state["avg_gain"] / state["avg_loss"])
+
+            rows.append([state["ema_10"], state["ema_30"], strength,
+                         macd_line, state["signal"], macd_line - state["signal"]])
+
+        return rows
+
+
+# Parameters StreamingIndicators computes; the clientside charts reuse the server's series while these are selected
+CHART_INDICATOR_PARAMS = {
+    "ema_short": StreamingIndicators.SPANS["ema_10"],
+    "ema_long": StreamingIndicators.SPANS["ema_30"],
+    "rsi_period": StreamingIndicators.RSI_PERIOD,
+    "macd_fast": StreamingIndicators.SPANS["ema_12"],
+    "macd_slow": StreamingIndicators.SPANS["ema_26"],
+    "macd_signal": StreamingIndicators.SPANS["signal"],
+}
+
+
+def indicator_store_path(ticker, interval):
+    return bar_store_path(ticker, interval).replace(".parquet", ".indicators.parquet")
+
+
+def read_indicator_store(ticker, interval):
+    """
+    Returns (indicators, state, as_of, anchor_close) - indicators is None if nothing usable is stored.
+    """
+    try:
+        table = pq.read_table(indicator_store_path(ticker, interval))
+        saved = json.loads((table.schema.metadata or {}).get(b"stockdash_indicators", b"{}"))
+    except (OSError, pa.ArrowInvalid, ValueError):
+        return None, None, None, None
+
+    if saved.get("version") != INDICATOR_STATE_VERSION:
+        return None, None, None, None
+    return table.to_pandas(), saved["state"], pd.Timestamp(saved["as_of"]), saved["anchor"]
+
+
+def write_indicator_store(ticker, interval, indicators, state, as_of, anchor_close):
+    path = indicator_store_path(ticker, interval)
+    saved = {"version": INDICATOR_STATE_VERSION, "state": state, "as_of": as_of.isoformat(), "anchor": anchor_close}
+    table = pa.Table.from_pandas(indicators.astype("float64"))
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"stockdash_indicators": json.dumps(saved).encode()})
+
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠ Could not write indicator store {path}: {e}")
+
+
+def get_chart_indicators(ticker, closes, interval="1d"):
+    """
+    Returns INDICATOR_COLUMNS for closes (a Close series indexed by date),
+    advancing the stored state over new bars only. The series is computed
+    from the first bar ever stored, so older values do not move as the
+    displayed window rolls forward.
+    """
+    closes = closes.sort_index()
+    known, state, as_of, anchor = read_indicator_store(ticker, interval)
+
+    # Stored state only counts if it starts early enough and the bar it ends on is unchanged (no split)
+    usable = (
+        known is not None and len(closes) > 0
+        and known.index[0] <= closes.index[0]
+        and as_of in closes.index
+        and np.isclose(closes[as_of], anchor, rtol=1e-9, atol=0)
+    )
+    if usable:
+        known = known[known.index <= as_of]
+        new_closes = closes[closes.index > as_of]
+    else:
+        known, state = pd.DataFrame(columns=INDICATOR_COLUMNS, dtype="float64"), None
+        new_closes = closes
+
+    settled = new_closes.iloc[:-1]
+    frames = [known] if len(known) else []
+
+    # A fresh history goes through the indicator engine; stored state is only stepped forward
+    if state is None:
+        settled_values, indicators = StreamingIndicators.from_history(settled.to_numpy())
+    else:
+        indicators = StreamingIndicators(state)
+        settled_values = indicators.update(settled.to_numpy())
+
+    if len(settled):
+        settled_rows = pd.DataFrame(settled_values, index=settled.index, columns=INDICATOR_COLUMNS)
+        frames.append(settled_rows)
+        write_indicator_store(ticker, interval, pd.concat(frames), indicators.state,
+                              settled.index[-1], float(settled.iloc[-1]))
+
+    live = new_closes.iloc[-1:]
+    if len(live):
+        frames.append(pd.DataFrame(indicators.update(live.to_numpy()), index=live.index, columns=INDICATOR_COLUMNS))
+
+    if not frames:
+        return pd.DataFrame(columns=INDICATOR_COLUMNS, index=closes.index, dtype="float64")
+    return pd.concat(frames).reindex(closes.index)
+
+
+# ---------------------------------------------------
+# Prefetch
+# ---------------------------------------------------
+# When the home page fills company_industry_list, the bar store and chart
+# indicators for the top rows by Total Profit are warmed in the background,
+# so a row click is usually served from disk. The pool is small, runs at
+# low OS priority and starts at most one download per PREFETCH_INTERVAL.
+# Scheduling a new list for a dataset cancels whatever is left of that
+# dataset's previous list; there are no user sessions here, so everyone
+# browsing the same country snapshot shares (and replaces) one list.
+PREFETCH_TOP_N = int(os.environ.get("STOCKDASH_PREFETCH_TOP_N", "10"))
+PREFETCH_WORKERS = 2
+PREFETCH_INTERVAL = 0.5   # seconds between prefetch downloads
+
+prefetch_executor = None
+prefetch_lock = threading.Lock()
+prefetch_cancelled = {}   # dataset key -> Event of its current schedule
+prefetch_next_start = 0.0
+
+
+def lower_thread_priority():
+    # Linux applies nice values per thread
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+    except (AttributeError, OSError):
+        pass
+
+
+def prefetch_ticker(ticker, cancelled):
+    global prefetch_next_start
+
+    start = period_start("1y")
+    _, covers_from, age = read_bar_store(ticker, "1d")
+    if covers_from is not None and covers_from <= start and age <= BAR_STORE_MAX_AGE:
+        return
+
+    # Take the next download slot; give up if the list changed while waiting
+    with prefetch_lock:
+        if cancelled.is_set():
+            return
+        slot = max(time.monotonic(), prefetch_next_start)
+        prefetch_next_start = slot + PREFETCH_INTERVAL
+    if cancelled.wait(max(0.0, slot - time.monotonic())):
+        return
+
+    try:
+        hist = get_price_history(ticker, period="1y", interval="1d")
+        if not hist.empty:
+            get_chart_indicators(ticker, hist["Close"])
+    except Exception as e:
+        print(f"⚠ Prefetch failed for {ticker}: {e}")
+
+
+def schedule_prefetch(tickers, dataset_key):
+    """
+    Warms price history for tickers (most wanted first), cancelling the
+    previous schedule for the same dataset. Returns the futures.
+    """
+    global prefetch_executor
+
+    with prefetch_lock:
+        if prefetch_executor is None:
+            prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="stockdash-prefetch",
+                                                   initializer=lower_thread_priority)
+
+        # Queued tasks of the old list return at once; waiting ones wake up and return
+        # (only running tasks hold a download slot, so at most PREFETCH_WORKERS slots go unused)
+        if dataset_key in prefetch_cancelled:
+            prefetch_cancelled[dataset_key].set()
+        cancelled = prefetch_cancelled[dataset_key] = threading.Event()
+
+        return [prefetch_executor.submit(prefetch_ticker, ticker, cancelled) for ticker in tickers]
+
+
+country = "UK"
+data_path = os.path.join(DATA_ROOT, country)
+
+df = read_snapshot(os.path.join(data_path, "BATCH.csv"), schema=normalise_batch_schema)
+#df_buysell = pd.read_csv(os.path.join(data_path, "BUYSELL.csv"), encoding='ISO-8859-1')  # or use 'cp1252'
+#treemap_df_batch = df
+#treemap_df_batch.columns = [col.strip() for col in treemap_df_batch.columns]
+treemap_sector_options = sorted(df["Sector"].dropna().unique())
+
+
+graph_properties = {
+    'mirror': True,
+    'ticks': 'outside',
+    'showline': True,
+    'linecolor': 'lightgrey',
+    'gridcolor': 'lightgrey'
+}
+
+
+def indicator_param_inputs(params):
+    """
+    Row of number inputs for (key, label) pairs of CHART_INDICATOR_PARAMS; read by assets/indicators.js.
+    """
+    return html.Div([
+        html.Div([
+            html.Label(label, style={"fontSize": "12px", "marginRight": "6px"}),
+            dcc.Input(
+                id=f"indicator-{key.replace('_', '-')}",
+                type="number", min=2, max=200, step=1,
+                value=CHART_INDICATOR_PARAMS[key],
+                debounce=True,
+                style={"width": "70px", "padding": "2px 6px", "border": "1px solid #ced4da", "borderRadius": "4px", "fontSize": "12px"}
+            ),
+        ], style={"display": "flex", "alignItems": "center"})
+        for key, label in params
+    ], style={"display": "flex", "gap": "16px", "padding": "6px 0"})
+
+news_columnDefs = [
+    {"field": "Date", "minWidth": 150, "maxWidth": 150, "sort": "desc"},
+    {"field": "Ticker", "minWidth": 120, "maxWidth": 120},
+    {"field": "link", "headerName": "Title", "linkTarget": "_blank", "minWidth": 900},
+    {"field": "publisher", "minWidth": 150},
+]
+
+# Filled in by the background warm-up (see run_warmup)
+index_data = {"UK": pd.DataFrame(), "US": pd.DataFrame()}
+sector_indices_data = {"UK": {}, "US": {}, "METALS": {}, "CRYPTO": {}}
+
+
+# ---------------------------------------------------
+# Batched sector price download
+# ---------------------------------------------------
+def sector_members(tickers):
+    # us_sector_indices maps to a single ETF symbol rather than a list
+    return [tickers] if isinstance(tickers, str) else list(tickers)
+
+
+def plan_sector_universe(*sector_maps):
+    """
+    Returns the de-duplicated union of every ticker across the given sector maps.
+    """
+    universe = set()
+    for sectors_indices in sector_maps:
+        for tickers in sectors_indices.values():
+            universe.update(sector_members(tickers))
+    return sorted(universe)
+
+
+def download_close_matrix(tickers, period="1y"):
+    """
+    Returns adjusted daily closes for all tickers as a wide frame (one column
+    per ticker, indexed by date). Only bars missing from the bar store are
+    downloaded, in a few multi-ticker requests.
+    """
+    start = period_start(period)
+    print(f"Updating sector prices for {len(tickers)} tickers")
+    update_bar_store(tickers, start)
+
+    closes = {}
+    for ticker in tickers:
+        bars, _, _ = read_bar_store(ticker, "1d")
+        bars = bars[bars.index >= start]
+        if not bars.empty:
+            closes[ticker] = bars["Adj Close"]
+
+    if not closes:
+        return pd.DataFrame()
+
+    return pd.DataFrame(closes).sort_index()
+
+
+def build_sector_indices(sectors_indices, close_matrix):
+    local_sector_data = {}
+    
+    for sector_name, tickers in sectors_indices.items():
+        # Slice this sector out of the shared close matrix
+        members = [t for t in sector_members(tickers) if t in close_matrix.columns]
+
+        if not members:
+            print(f"⚠ No close prices for sector: {sector_name}")
+            continue
+
+        closes = close_matrix[members].dropna(how="all")  # drop rows where ALL tickers are NaN
+
+        if closes.empty:
+            print(f"⚠ All tickers failed for sector: {sector_name}")
+            continue
+
+        # Remove tickers that failed entirely
+        closes = closes.dropna(axis=1, how="all")
+
+        if closes.empty:
+            print(f"⚠ No usable tickers left in sector: {sector_name}")
+            continue
+
+        # Ensure at least 1 row remains
+        if len(closes) < 2:
+            print(f"⚠ Not enough data for sector: {sector_name}")
+            continue
+
+        norm = closes / closes.iloc[0] * 100.0
+        sector_index = norm.mean(axis=1)
+
+        sdf = pd.DataFrame({"Close": sector_index})
+
+        sdf["DPCM_raw"] = sdf["Close"].diff()
+        sdf["DPCM_q"] = sdf["DPCM_raw"].apply(lambda x: 1 if x > 0 else (-1 if x < 0 else 0))
+
+        local_sector_data[sector_name] = sdf
+        
+    return local_sector_data
+
+
+def get_index_map():
+    #Usage
+    #index_map = get_index_map()
+    #index_ticker = index_map[country]["ticker"]
+    #index_label  = index_map[country]["label"]
+
+    return {
+        "UK": {"ticker": "^FTSE", "label": "FTSE 100", "data": index_data["UK"]},
+        "US": {"ticker": "^GSPC", "label": "S&P 500", "data": index_data["US"]}
+    }
+
+
+# ---------------------------------------------------
+# Background warm-up
+# ---------------------------------------------------
+# Index and sector histories come from Yahoo, so they are loaded on a
+# background thread instead of at import time. Pages render a placeholder
+# until their dataset shows up in warmup_status["ready"].
+# STOCKDASH_BACKGROUND_JOBS=0 skips starting the warm-up, snapshot watcher
+# and RNS crawler on import, for scripts that only want the module's functions.
+BACKGROUND_JOBS = os.environ.get("STOCKDASH_BACKGROUND_JOBS", "1") != "0"
+warmup_lock = threading.Lock()
+warmup_status = {
+    "state": "pending",     # pending -> loading -> ready / degraded
+    "ready": [],
+    "errors": {},
+    "started": None,
+    "finished": None,
+}
+
+
+def get_warmup_status():
+    with warmup_lock:
+        return {**warmup_status, "ready": list(warmup_status["ready"]), "errors": dict(warmup_status["errors"])}
+
+
+def run_warmup_step(name, loader):
+    try:
+        loader()
+        with warmup_lock:
+            warmup_status["ready"].append(name)
+    except Exception as e:
+        print(f"⚠ Warm-up step {name} failed: {e}")
+        with warmup_lock:
+            warmup_status["errors"][name] = str(e)
+
+
+def run_warmup():
+    with warmup_lock:
+        warmup_status["state"] = "loading"
+        warmup_status["started"] = datetime.now().isoformat(timespec="seconds")
+
+    def load_index(country, index_ticker):
+        data = get_price_history(index_ticker, period="1y", interval="1wk", auto_adjust=True)
+        if data.empty:
+            raise ValueError(f"no data returned for {index_ticker}")
+        index_data[country] = data
+
+    def load_sectors(region, sectors, close_matrix):
+        data = build_sector_indices(sectors, close_matrix)
+        if not data:
+            raise ValueError(f"no sector data returned for {region}")
+        sector_indices_data[region] = data
+
+    for country, index_info in get_index_map().items():
+        run_warmup_step(f"index:{country}", lambda: load_index(country, index_info["ticker"]))
+
+    # One de-duplicated download covers every sector universe
+    sector_universes = {"UK": uk_sector_indices, "US": us_sector_indices,
+                        "METALS": metals_indices, "CRYPTO": crypto_indices}
+    close_matrix = pd.DataFrame()
+    try:
+        close_matrix = download_close_matrix(plan_sector_universe(*sector_universes.values()))
+    except Exception as e:
+        print(f"⚠ Sector price download failed: {e}")
+
+    for region, sectors in sector_universes.items():
+        run_warmup_step(f"sectors:{region}", lambda: load_sectors(region, sectors, close_matrix))
+
+    for country in ("UK", "US"):
+        for kind in ("BATCH", "BUYSELL"):
+            run_warmup_step(f"history:{country}:{kind}", lambda: update_snapshot_history(country, kind))
+
+    with warmup_lock:
+        warmup_status["state"] = "degraded" if warmup_status["errors"] else "ready"
+        warmup_status["finished"] = datetime.now().isoformat(timespec="seconds")
+
+
+def start_warmup():
+    with warmup_lock:
+        if warmup_status["state"] != "pending":
+            return
+        warmup_status["state"] = "loading"
+
+    threading.Thread(target=run_warmup, name="stockdash-warmup", daemon=True).start()
+
+
+def index_buysell_ledger(df_buysell):
+    """
+    Sorts the trade ledger by ticker (keeping each ticker's trades in file order)
+    and returns it with a ticker -> (start, end, total_profit) row-offset index.
+    """
+    df_buysell = df_buysell.sort_values("Ticker", kind="mergesort", na_position="last").reset_index(drop=True)
+
+    tickers = df_buysell["Ticker"]
+    known = int(tickers.notna().sum())
+    if known == 0:
+        return df_buysell, {}
+
+    ticker_values = tickers.iloc[:known].to_numpy()
+    starts = np.flatnonzero(np.r_[True, ticker_values[1:] != ticker_values[:-1]])
+    ends = np.r_[starts[1:], known]
+    profit = pd.to_numeric(df_buysell["Profit"].iloc[:known], errors="coerce").fillna(0).to_numpy(dtype=float)
+    totals = np.add.reduceat(profit, starts)
+
+    buysell_index = {
+        ticker_values[start]: (int(start), int(end), float(total))
+        for start, end, total in zip(starts, ends, totals)
+    }
+    return df_buysell, buysell_index
+
+
+def load_country_data(country):
+    data_path = os.path.join(DATA_ROOT, country)
+
+    df = read_snapshot(os.path.join(data_path, "BATCH.csv"), schema=normalise_batch_schema)
+    df_buysell, buysell_index = index_buysell_ledger(read_snapshot(os.path.join(data_path, "BUYSELL.csv")))
+    past_df = pd.read_csv(os.path.join(data_path, "PAST.csv"), header=None)
+    
+    filenames = past_df.iloc[:, 0].tolist()
+    values = past_df.iloc[:, 1].tolist()
+    target_len = 52
+    padded_values = [0] * (target_len - len(values)) + values[-target_len:]
+    padded_filenames = [None] * (target_len - len(filenames)) + filenames[-target_len:]
+    
+    # Tree Map Data
+    df_batch = df
+    df_batch = df_batch.dropna(subset=["Ticker", "Sector", "Industry"])
+    sector_options = sorted(df_batch["Sector"].dropna().unique())
+            
+    return df, df_buysell, padded_filenames, padded_values, sector_options, buysell_index
+
+
+# ---------------------------------------------------
+# Server-side dataset registry
+# ---------------------------------------------------
+# Parsed country snapshots stay in process, keyed by "<country>:<version>".
+# Browser stores only carry that key, so callbacks never ship or rebuild
+# the BATCH/BUYSELL frames. Frames handed out here are shared - treat them
+# as read-only.
+#
+# dataset_current maps each country to its live key. Requests always get
+# the live version; newer files are picked up by the snapshot watcher, which
+# parses them in the background and then swaps the key in one assignment.
+dataset_registry = {}
+dataset_current = {}
+dataset_registry_lock = threading.Lock()
+
+
+def snapshot_version(country):
+    data_path = os.path.join(DATA_ROOT, country)
+    stats = [os.stat(os.path.join(data_path, name)) for name in ("BATCH.csv", "BUYSELL.csv", "PAST.csv")]
+    fingerprint = "|".join(f"{st.st_mtime_ns}:{st.st_size}" for st in stats)
+    return hashlib.sha1(fingerprint.encode()).hexdigest()[:12]
+
+
+def register_country_data(country, refresh=False):
+    """
+    Returns the live dataset key for country, loading it on first use.
+    With refresh=True the files on disk are re-checked and a newer
+    snapshot is loaded and swapped in.
+    """
+    with dataset_registry_lock:
+        live_key = dataset_current.get(country)
+
+    if live_key and not refresh:
+        return live_key
+
+    key = f"{country}:{snapshot_version(country)}"
+    if key == live_key:
+        return key
+
+    dataset = load_country_data(country)
+
+    with dataset_registry_lock:
+        dataset_registry[key] = dataset
+        dataset_current[country] = key
+        for stale_key in [k for k in dataset_registry if k.startswith(f"{country}:") and k != key]:
+            del dataset_registry[stale_key]
+
+    return key
+
+
+def get_dataset(key):
+    """
+    Returns (df, df_buysell, padded_filenames, padded_values, sector_options, buysell_index) for a dataset key.
+    """
+    with dataset_registry_lock:
+        dataset = dataset_registry.get(key)
+
+    if dataset is None:
+        # Another worker registered it, or a newer snapshot replaced it
+        country = key.split(":")[0]
+        dataset = get_dataset(register_country_data(country))
+
+    return dataset
+
+
+# ---------------------------------------------------
+# Snapshot watcher
+# ---------------------------------------------------
+# Polls the BATCH/BUYSELL/PAST stats of every loaded country. A changed
+# version has to be seen on two polls in a row (so a half-copied file is not
+# parsed), then it is loaded off the request path and swapped in. Derived
+# data (history store, module-level frames) is refreshed after the swap.
+SNAPSHOT_WATCH_INTERVAL = float(os.environ.get("STOCKDASH_WATCH_INTERVAL", "5"))
+
+snapshot_watcher_started = threading.Event()
+
+
+def refresh_country_snapshot(watched):
+    global df, treemap_sector_options
+
+    key = register_country_data(watched, refresh=True)
+
+    if watched == country:
+        # Module-level frame used by the initial layout and older helpers
+        df = get_dataset(key)[0]
+        treemap_sector_options = sorted(df["Sector"].dropna().unique())
+
+    for kind in ("BATCH", "BUYSELL"):
+        update_snapshot_history(watched, kind)
+
+    return key
+
+
+def watch_snapshots():
+    pending = {}
+
+    while True:
+        time.sleep(SNAPSHOT_WATCH_INTERVAL)
+
+        with dataset_registry_lock:
+            live_keys = dict(dataset_current)
+
+        for watched, live_key in live_keys.items():
+            try:
+                version = snapshot_version(watched)
+            except OSError:
+                continue  # A file is being replaced, try again next poll
+
+            if live_key == f"{watched}:{version}":
+                pending.pop(watched, None)
+                continue
+
+            if pending.get(watched) != version:
+                pending[watched] = version
+                continue
+
+            try:
+                key = refresh_country_snapshot(watched)
+                print(f"Loaded new {watched} snapshot {key}")
+            except Exception as e:
+                print(f"⚠ Could not load new {watched} snapshot: {e}")
+            pending.pop(watched, None)
+
+
+def start_snapshot_watcher():
+    if snapshot_watcher_started.is_set() or SNAPSHOT_WATCH_INTERVAL <= 0:
+        return
+    snapshot_watcher_started.set()
+
+    threading.Thread(target=watch_snapshots, name="stockdash-snapshot-watcher", daemon=True).start()
+
+
+# ---------------------------------------------------
+# Snapshot history store
 # ---------------------------------------------------
-us_sector_indices = {
-    "Materials (XLB)": "XLB",
-    "Energy (XLE)": "XLE",
-    "Financials (XLF)": "XLF",
-    "Industrials (XLI)": "XLI",
-    "Technology (XLK)": "XLK",
-    "Consumer Staples (XLP)": "XLP",
-    "Utilities (XLU)": "XLU",
-    "Health Care (XLV)": "XLV",
-    "Consumer Discretionary (XLY)": "XLY",
-    "Real Estate (XLRE)": "XLRE",
-    "Communication Services (XLC)": "XLC"
-}
-
-metals_indices = {
-    "Gold": ["GC=F"],
-    "Silver": ["SI=F"],
-    "Platinum": ["PL=F"],
-    "Palladium": ["PA=F"],
-    "Copper": ["HG=F"]
-}
-
-crypto_indices = {
-    "Bitcoin": ["BTC-USD"],
-    "Ethereum": ["ETH-USD"],
-    "Solana": ["SOL-USD"],
-    "Binance Coin": ["BNB-USD"],
-    "XRP": ["XRP-USD"]
+# Every dated UK_YYYYMMDD_BATCH.csv / YYYYMMDD_BUYSELL.csv for a country is
+# consolidated into one zstd Parquet file, sorted by (Ticker, Snapshot) so a
+# ticker's history is a row-group-pruned read. The footer records which CSVs
+# (mtime/size) are in it; new or changed snapshots are merged in on update.
+SNAPSHOT_HISTORY_DIR = os.path.join(CACHE_ROOT, "history")
+SNAPSHOT_HISTORY_ROW_GROUP = 4096
+SNAPSHOT_FILE_PATTERN = re.compile(r'^(?:[A-Z]+_)?(\d{8})_(BATCH|BUYSELL)\.csv$')
+
+# Older dated files start with a timestamp line (and blank lines) before the header
+SNAPSHOT_REQUIRED_COLUMNS = {
+    "BATCH": ["Ticker", "Name", "Sector", "Industry", "Total Profit"],
+    "BUYSELL": ["Ticker", "Date", "Signal", "Price"],
 }
+SNAPSHOT_PREAMBLE_LINES = 20
 
+snapshot_history_lock = threading.Lock()
 
-# Load data
-DATA_ROOT = "data/Exchange"
-country = "UK"
-data_path = os.path.join(DATA_ROOT, country)
 
-df = pd.read_csv(os.path.join(data_path, "BATCH.csv"), encoding='ISO-8859-1')  # or use 'cp1252'
-#df_buysell = pd.read_csv(os.path.join(data_path, "BUYSELL.csv"), encoding='ISO-8859-1')  # or use 'cp1252'
-#treemap_df_batch = df
-#treemap_df_batch.columns = [col.strip() for col in treemap_df_batch.columns]
-treemap_sector_options = sorted(df["Sector"].dropna().unique())
+def list_dated_snapshots(country, kind="BATCH"):
+    """
+    Returns {filename: (snapshot_date, path)} for the dated snapshots of one kind.
+    """
+    data_path = os.path.join(DATA_ROOT, country)
+    snapshots = {}
 
+    for name in sorted(os.listdir(data_path)):
+        match = SNAPSHOT_FILE_PATTERN.match(name)
+        if match and match.group(2) == kind:
+            snapshots[name] = (pd.Timestamp(match.group(1)), os.path.join(data_path, name))
 
-graph_properties = {
-    'mirror': True,
-    'ticks': 'outside',
-    'showline': True,
-    'linecolor': 'lightgrey',
-    'gridcolor': 'lightgrey'
-}
+    return snapshots
 
-news_columnDefs = [
-    {"field": "Date", "minWidth": 150, "maxWidth": 150, "sort": "desc"},
-    {"field": "Ticker", "minWidth": 120, "maxWidth": 120},
-    {"field": "link", "headerName": "Title", "linkTarget": "_blank", "minWidth": 900},
-    {"field": "publisher", "minWidth": 150},
-]
 
-uk_stock_data = yf.download("^FTSE", period="1y", interval="1wk", auto_adjust=True) 
-us_stock_data = yf.download("^GSPC", period="1y", interval="1wk", auto_adjust=True)
+def snapshot_history_path(country, kind="BATCH"):
+    return os.path.join(SNAPSHOT_HISTORY_DIR, f"{country}_{kind}.parquet")
 
 
+def read_snapshot_history_manifest(path):
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+        manifest = json.loads(metadata.get(b"stockdash_history", b"{}"))
+    except (OSError, pa.ArrowInvalid, ValueError):
+        return {}
 
-def build_sector_indices(sectors_indices):
-    local_sector_data = {}
-    
-    for sector_name, tickers in sectors_indices.items():
-        print (f"{sector_name}:  {tickers}")
-        # Try downloading — allow partial success
-        df = yf.download(tickers, period="1y", auto_adjust=True, progress=True)
+    return manifest if manifest.get("schema") == SNAPSHOT_CACHE_SCHEMA else {}
 
-        if df.empty:
-            print(f"⚠ No data for sector: {sector_name}")
-            continue
 
-        # Flatten MultiIndex if needed
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = ['_'.join(col).strip() for col in df.columns]
+def snapshot_header_row(path, kind, encoding='ISO-8859-1'):
+    """
+    Index of the line holding the snapshot's column names, skipping any preamble.
+    """
+    with open(path, encoding=encoding) as f:
+        for index, line in enumerate(f):
+            if index >= SNAPSHOT_PREAMBLE_LINES:
+                break
+            if "Ticker" in [field.strip() for field in line.split(",")]:
+                return index
+    raise ValueError(f"no {kind} header row in the first {SNAPSHOT_PREAMBLE_LINES} lines")
 
-        # Extract Close_ columns
-        close_cols = [c for c in df.columns if c.startswith("Close_")]
 
-        if not close_cols:
-            print(f"⚠ No close prices for sector: {sector_name}")
-            continue
+def parse_dated_snapshot(path, snapshot_date, kind):
+    header = snapshot_header_row(path, kind)
+    frame = pd.read_csv(path, encoding='ISO-8859-1', low_memory=False, skiprows=header)
 
-        closes = df[close_cols].dropna(how="all")  # drop rows where ALL tickers are NaN
+    missing = [col for col in SNAPSHOT_REQUIRED_COLUMNS[kind] if col not in frame.columns]
+    if missing:
+        raise ValueError(f"missing {kind} columns {missing}")
 
-        if closes.empty:
-            print(f"⚠ All tickers failed for sector: {sector_name}")
-            continue
+    frame = normalise_snapshot_dtypes(frame)
+    if kind == "BATCH":
+        frame = normalise_batch_schema(frame)
 
-        # Remove tickers that failed entirely
-        closes = closes.dropna(axis=1, how="all")
+    frame.insert(0, "Snapshot", snapshot_date)
+    return frame
 
-        if closes.empty:
-            print(f"⚠ No usable tickers left in sector: {sector_name}")
-            continue
 
-        # Normalize
-        closes.columns = [c.replace("Close_", "") for c in closes.columns]
+def update_snapshot_history(country, kind="BATCH"):
+    """
+    Merges any new or changed dated snapshots into the history store and
+    returns how many snapshot files were (re)ingested.
+    """
+    path = snapshot_history_path(country, kind)
+
+    with snapshot_history_lock:
+        snapshots = list_dated_snapshots(country, kind)
+        manifest = read_snapshot_history_manifest(path)
+        ingested = manifest.get("files", {})
+
+        stamps = {}
+        for name, (_, csv_path) in snapshots.items():
+            stat = os.stat(csv_path)
+            stamps[name] = f"{stat.st_mtime_ns}:{stat.st_size}"
+
+        pending = [name for name in snapshots if ingested.get(name) != stamps[name]]
+        removed = [name for name in ingested if name not in snapshots]
+        if not pending and not removed:
+            return 0
+
+        frames = []
+        if manifest and os.path.exists(path):
+            history = pq.read_table(path).to_pandas()
+            keep_dates = {snapshots[name][0] for name in snapshots if name not in pending}
+            frames.append(history[history["Snapshot"].isin(keep_dates)])
+
+        for name in pending:
+            snapshot_date, csv_path = snapshots[name]
+            try:
+                frames.append(parse_dated_snapshot(csv_path, snapshot_date, kind))
+            except (OSError, ValueError, pd.errors.ParserError) as e:
+                print(f"⚠ Skipping snapshot {csv_path}: {e}")
+                stamps.pop(name)
 
-        # Ensure at least 1 row remains
-        if len(closes) < 2:
-            print(f"⚠ Not enough data for sector: {sector_name}")
-            continue
+        history = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        if history.empty:
+            return 0
 
-        norm = closes / closes.iloc[0] * 100.0
-        sector_index = norm.mean(axis=1)
+        # Files disagree on which columns are numeric/categorical; store what is left as text
+        for col in history.columns:
+            if history[col].dtype == object or isinstance(history[col].dtype, pd.CategoricalDtype):
+                history[col] = history[col].astype("string")
 
-        sdf = pd.DataFrame({"Close": sector_index})
-        sdf.index = sdf.index.tz_localize(None)
+        history = history.sort_values(["Ticker", "Snapshot"], kind="mergesort").reset_index(drop=True)
 
-        sdf["DPCM_raw"] = sdf["Close"].diff()
-        sdf["DPCM_q"] = sdf["DPCM_raw"].apply(lambda x: 1 if x > 0 else (-1 if x < 0 else 0))
+        table = pa.Table.from_pandas(history, preserve_index=False)
+        manifest = {"schema": SNAPSHOT_CACHE_SCHEMA, "files": stamps}
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                               b"stockdash_history": json.dumps(manifest).encode()})
 
-        local_sector_data[sector_name] = sdf
-        
-    return local_sector_data
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(SNAPSHOT_HISTORY_DIR, exist_ok=True)
+        pq.write_table(table, tmp_path, compression="zstd", row_group_size=SNAPSHOT_HISTORY_ROW_GROUP)
+        os.replace(tmp_path, path)
 
+    return len(pending)
 
-def get_index_map():
-    #Usage
-    #index_map = get_index_map()
-    #index_ticker = index_map[country]["ticker"]
-    #index_label  = index_map[country]["label"]
 
-    return {
-        "UK": {"ticker": "^FTSE", "label": "FTSE 100", "data": uk_stock_data},
-        "US": {"ticker": "^GSPC", "label": "S&P 500", "data": us_stock_data}
-    }
+def get_snapshot_history(country, ticker, columns=None, kind="BATCH"):
+    """
+    Returns every stored snapshot row for ticker, indexed by snapshot date,
+    e.g. get_snapshot_history("UK", "BP.L", ["Total Profit", "Num of Trades"]).
+    """
+    path = snapshot_history_path(country, kind)
+    if not os.path.exists(path):
+        update_snapshot_history(country, kind)
+    if not os.path.exists(path):
+        return pd.DataFrame()
 
+    if columns is not None:
+        available = set(pq.read_schema(path).names)
+        columns = ["Snapshot", "Ticker"] + [col for col in columns if col in available]
 
-def load_country_data(country):
-    data_path = os.path.join(DATA_ROOT, country)
+    table = pq.read_table(path, columns=columns, filters=[("Ticker", "==", ticker)])
+    return table.to_pandas().set_index("Snapshot")
 
-    df = pd.read_csv(os.path.join(data_path, "BATCH.csv"), encoding='ISO-8859-1')
-    df_buysell = pd.read_csv(os.path.join(data_path, "BUYSELL.csv"), encoding='ISO-8859-1')
-    past_df = pd.read_csv(os.path.join(data_path, "PAST.csv"), header=None)
-    
-    filenames = past_df.iloc[:, 0].tolist()
-    values = past_df.iloc[:, 1].tolist()
-    target_len = 52
-    padded_values = [0] * (target_len - len(values)) + values[-target_len:]
-    padded_filenames = [None] * (target_len - len(filenames)) + filenames[-target_len:]
-    
-    # Tree Map Data
-    df_batch = df
-    df_batch = df_batch.dropna(subset=["Ticker", "Sector", "Industry"])
-    sector_options = sorted(df_batch["Sector"].dropna().unique())
-            
-    return df, df_buysell, padded_filenames, padded_values, sector_options
-        
 
 def create_figure(padded_values, country):
     index_map = get_index_map()
@@ -252,6 +1893,27 @@ def create_figure(padded_values, country):
     index_ticker = index_map[country]["ticker"]
     
     stock_data = index_map[country]["data"]
+
+    # Index history is still loading (or failed) - show the profit bars on their own
+    if stock_data.empty:
+        note = "unavailable" if f"index:{country}" in get_warmup_status()["errors"] else "loading…"
+        return {
+            'data': [go.Bar(
+                y=padded_values,
+                name='stockDash Profit',
+                opacity=0.6,
+                marker=dict(color='rgba(88,130,193,0.7)')
+            )],
+            'layout': go.Layout(
+                title=f"{index_label} data {note}",
+                plot_bgcolor="#ffffff",
+                paper_bgcolor="#ffffff",
+                font=dict(family="Segoe UI", size=14),
+                margin=dict(t=90, l=100, r=100, b=40),
+                xaxis=graph_properties,
+                yaxis=dict(title='stockDash Profit', **graph_properties)
+            )
+        }
     
     #stock_data = yf.download(index_ticker, period="1y", interval="1wk", auto_adjust=True)
 
@@ -333,7 +1995,7 @@ menuitems = [
 
 
 # Calculate totals
-sector_profits = df.groupby("Sector")["Total Profit"].sum()
+sector_profits = df.groupby("Sector", observed=True)["Total Profit"].sum()
 total_profit_all = sector_profits.sum()
 selected_company=""
 
@@ -372,14 +2034,6 @@ sector_summary_card = dbc.Card(
     style={"backgroundColor": "#f8f9fa"}
 )
 
-sector_data = {}
-uk_sector_indices_data = build_sector_indices(uk_sector_indices)
-us_sector_indices_data = build_sector_indices(us_sector_indices)
-metals_indices_data = build_sector_indices(metals_indices)
-crypto_indices_data = build_sector_indices(crypto_indices)
-
-sector_data = uk_sector_indices_data
-
 # Insert into your homepage_content layout
 homepage_content = dbc.Card(
     dbc.CardBody([
@@ -409,11 +2063,15 @@ homepage_content = dbc.Card(
                         style={"width": "250px", "marginBottom": "20px"}
                     ),
                     dcc.Store(id="country-store", data="UK"),
-                    dcc.Store(id="store-df-batch"),
-                    dcc.Store(id="store-df-buysell"),
+                    dcc.Store(id="store-dataset-key"),
                     dcc.Store(id="store-padded-filenames"),
                     dcc.Store(id="store-padded-values"),
                     dcc.Store(id="store-sector-options"),
+                    # Selected ticker's bars; the indicator charts are drawn from these in the browser
+                    dcc.Store(id="stock-price-bars"),
+                    dcc.Store(id="stock-chart-range"),
+                    dcc.Store(id="calculator-price-bars"),
+                    dcc.Store(id="calculator-chart-range"),
                     
                     #dbc.Row(sector_summary_card, className="gx-3", align="stretch"),
                     html.Div(id="sector-summary-container"),
@@ -446,10 +2104,15 @@ homepage_content = dbc.Card(
                                     width="auto"
                                 ),
                                 dbc.Col(
-                                    dbc.Button("Download", id="download-btn", color="primary", className="mb-3"),
+                                    dbc.Button("Download", id="download-btn", color="primary", className="mb-3",
+                                               disabled=True, external_link=True),
                                     width="auto"
                                 ),
-                                Download(id='download')
+                                dbc.Col(
+                                    dbc.Button("Download All (zip)", id="download-bundle-btn", color="secondary",
+                                               className="mb-3", external_link=True),
+                                    width="auto"
+                                )
                             ], align="center", justify="start")
                         ], style={'marginTop': '20px'})
                     ]),
@@ -496,8 +2159,6 @@ treemap_content = dbc.Card(
 
                     ], style={"display": "flex", "gap": "15px", "flexWrap": "wrap"}),
 
-                    dcc.Store(id="stored-data"),
-
                     html.Div([
                         dcc.Loading(
                             id="loading-treemap",
@@ -543,13 +2204,13 @@ propage_content = dbc.Card(
                         {"field": "Ticker", "minWidth": 90, "maxWidth": 90},
                         {"field": "Name", "minWidth": 240, "maxWidth": 240},
                         {"field": "Industry", "minWidth": 240, "maxWidth": 240},
-                        {"field": "Avg Hold Period(days)", "headerClass": "wrap-header", "minWidth": 120, "maxWidth": 120},
+                        {"field": "Avg Hold Period(days)", "headerClass": "wrap-header", "minWidth": 120, "maxWidth": 120, **UNKNOWN_FORMATTER},
                         {"field": "BUY Range", "minWidth": 150, "maxWidth": 150},
                         {"field": "SELL Range", "minWidth": 150, "maxWidth": 150},
                         {"field": "Price Movement", "minWidth": 150, "maxWidth": 150},
-                        {"field": "Dropped Samples %", "headerClass": "wrap-header", "minWidth": 110, "maxWidth": 110},
-                        {"field": "Ask-Bid Spread", "headerClass": "wrap-header", "minWidth": 110, "maxWidth": 110},
-                        {"field": "Total Profit", "minWidth": 110, "maxWidth": 110}
+                        {"field": "Dropped Samples %", "headerClass": "wrap-header", "minWidth": 110, "maxWidth": 110, **UNKNOWN_FORMATTER},
+                        {"field": "Ask-Bid Spread", "headerClass": "wrap-header", "minWidth": 110, "maxWidth": 110, **UNKNOWN_FORMATTER},
+                        {"field": "Total Profit", "minWidth": 110, "maxWidth": 110, **UNKNOWN_FORMATTER}
                     ],
                     rowData=df.to_dict("records"),
                     columnSize="sizeToFit",
@@ -719,6 +2380,7 @@ propage_content = dbc.Card(
                                     label="MACD",
                                     children=[
                                         html.Div([
+                                            indicator_param_inputs([("macd_fast", "Fast"), ("macd_slow", "Slow"), ("macd_signal", "Signal")]),
                                             dcc.Graph(
                                                 id="macd-graph",
                                                 style={"border": "1px solid #D3D3D3", "paddingTop": "5px"}
@@ -747,6 +2409,7 @@ propage_content = dbc.Card(
                                     label="RSI",
                                     children=[
                                         html.Div([
+                                            indicator_param_inputs([("rsi_period", "Period")]),
                                             dcc.Graph(
                                                 id="rsi-graph",
                                                 style={"border": "1px solid #D3D3D3", "paddingTop": "5px"}
@@ -776,6 +2439,7 @@ propage_content = dbc.Card(
                                     label="EMA",
                                     children=[
                                         html.Div([
+                                            indicator_param_inputs([("ema_short", "Short span"), ("ema_long", "Long span")]),
                                             dcc.Graph(
                                                 id="ema-graph",
                                                 style={"border": "1px solid #D3D3D3", "paddingTop": "5px"}
@@ -833,6 +2497,8 @@ propage_content = dbc.Card(
 )
 
 
+ADVANCED_FILTER_BLOCK_SIZE = 100   # rows per getRowsRequest, whatever the size of the universe
+
 advanced_filter = html.Div([
     dbc.Container([
         # Store for user filter selections
@@ -1039,16 +2705,18 @@ advanced_filter = html.Div([
                 {"field": "Name", "minWidth": 230, "maxWidth": 300},
                 {"field": "Sector", "minWidth": 170, "maxWidth": 300},
                 {"field": "Industry", "minWidth": 220, "maxWidth": 320},
-                {"field": "Avg Hold Period(days)", "headerClass": "wrap-header", "minWidth": 120, "maxWidth": 120},
-                {"field": "Volume Indicator", "headerClass": "wrap-header", "minWidth": 100, "maxWidth": 100},
-                {"field": "Num of Trades", "headerClass": "wrap-header", "minWidth": 90, "maxWidth": 90},
-                {"field": "Beta Risk", "headerClass": "wrap-header", "minWidth": 90, "maxWidth": 110},
-                {"field": "Dropped Samples %", "headerClass": "wrap-header", "minWidth": 110, "maxWidth": 110},
-                {"field": "Ask-Bid Spread", "headerClass": "wrap-header", "minWidth": 110, "maxWidth": 110},
-                {"field": "last Price", "minWidth": 100, "maxWidth": 100},
-                {"field": "Total Profit", "minWidth": 110, "maxWidth": 110}
+                {"field": "Avg Hold Period(days)", "headerClass": "wrap-header", "minWidth": 120, "maxWidth": 120, **UNKNOWN_FORMATTER},
+                {"field": "Volume Indicator", "headerClass": "wrap-header", "minWidth": 100, "maxWidth": 100, **UNKNOWN_FORMATTER},
+                {"field": "Num of Trades", "headerClass": "wrap-header", "minWidth": 90, "maxWidth": 90, **UNKNOWN_FORMATTER},
+                {"field": "Beta Risk", "headerClass": "wrap-header", "minWidth": 90, "maxWidth": 110, **UNKNOWN_FORMATTER},
+                {"field": "Dropped Samples %", "headerClass": "wrap-header", "minWidth": 110, "maxWidth": 110, **UNKNOWN_FORMATTER},
+                {"field": "Ask-Bid Spread", "headerClass": "wrap-header", "minWidth": 110, "maxWidth": 110, **UNKNOWN_FORMATTER},
+                {"field": "last Price", "minWidth": 100, "maxWidth": 100, **UNKNOWN_FORMATTER},
+                {"field": "Total Profit", "minWidth": 110, "maxWidth": 110, **UNKNOWN_FORMATTER}
             ],
-            rowData=[],  # updated via callback
+            # Rows are fetched a block at a time by serve_advanced_filter_rows
+            rowModelType="infinite",
+            dashGridOptions={"cacheBlockSize": ADVANCED_FILTER_BLOCK_SIZE, "maxBlocksInCache": 10},
             columnSize="sizeToFit",
             style={"height": "600px", "width": "100%"},
             className="ag-theme-alpine"
@@ -1512,12 +3180,208 @@ sector_indicies_content = dbc.Card(
 
 
 
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+# Slow Pro Analysis parts (price/indicator charts, news) run as background
+# callback jobs; a job is killed when its request is superseded or cancelled.
+# DiskcacheManager forks this process for every job while the warm-up,
+# snapshot watcher, RNS crawler and prefetch threads may be holding locks.
+# A lock held at the fork would never be released in the child, so every
+# module-level lock is replaced in the child (reset_locks_after_fork), and
+# per-process state a job uses (fetch pool, HTTP session) is recreated when
+# the PID changes. Keep background=True to those two network-bound callbacks.
+FORK_RESET_LOCKS = [
+    "http_session_lock", "http_circuits_lock", "fetch_executor_lock", "bar_store_lock",
+    "prefetch_lock", "warmup_lock", "dataset_registry_lock", "snapshot_history_lock",
+]
+
+
+def reset_locks_after_fork():
+    for name in FORK_RESET_LOCKS:
+        globals()[name] = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_locks_after_fork)
+
+background_callback_manager = DiskcacheManager(diskcache.Cache(os.path.join(CACHE_ROOT, "jobs")))
+
+app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP],
+                background_callback_manager=background_callback_manager)
 
 server = app.server
 
+
+@server.route("/health")
+def health():
+    # Liveness: the app is serving, whatever state the warm-up is in
+    return jsonify(get_warmup_status())
+
+
+@server.route("/ready")
+def ready():
+    status = get_warmup_status()
+    return jsonify(status), (200 if status["state"] in ("ready", "degraded") else 503)
+
+
+@server.route("/rns/search")
+def rns_search():
+    # Market-wide announcement search over the crawled RNS index: /rns/search?q=...&limit=50
+    limit = min(request.args.get("limit", 50, type=int), 500)
+    results = search_rns(request.args.get("q", ""), limit)
+    return jsonify([
+        {"date": item["Date"].isoformat(), "ticker": item["Ticker"], "title": news_link_parts(item["link"])[1],
+         "url": news_link_parts(item["link"])[0], "publisher": item["publisher"]}
+        for item in results
+    ])
+
+
+# ---------------------------------------------------
+# Raw log downloads
+# ---------------------------------------------------
+# Weekly raw logs are streamed straight from disk instead of being base64'd
+# through a dcc.Download callback:
+#   /download/<country>/<file>       gzip on the fly when the client accepts it,
+#                                    plain bytes with Range/resume otherwise;
+#                                    ETag / If-None-Match either way
+#   /download/<country>/bundle.zip   the weeks listed in PAST.csv, zipped as it streams
+#                                    (?weeks=N for only the most recent N)
+# Only the weekly logs PAST.csv lists are served; the snapshots next to them
+# (BATCH.csv, BUYSELL.csv, PAST.csv itself) are not downloads.
+DOWNLOAD_CHUNK = 256 * 1024
+DOWNLOAD_NAME_PATTERN = re.compile(r'^[\w.-]+\.txt$')
+
+
+def listed_raw_logs(country):
+    if not re.fullmatch(r'[A-Z]+', country):
+        abort(404)
+
+    past_path = os.path.join(DATA_ROOT, country, "PAST.csv")
+    if not os.path.isfile(past_path):
+        abort(404)
+
+    filenames = pd.read_csv(past_path, header=None).iloc[:, 0].dropna().astype(str).tolist()
+    return [name for name in filenames if DOWNLOAD_NAME_PATTERN.match(name)]
+
+
+def resolve_download_path(country, filename):
+    if not DOWNLOAD_NAME_PATTERN.match(filename) or filename not in listed_raw_logs(country):
+        abort(404)
+
+    path = os.path.join(DATA_ROOT, country, filename)
+    if not os.path.isfile(path):
+        abort(404)
+
+    return path
+
+
+def iter_file_chunks(path):
+    with open(path, "rb") as f:
+        while chunk := f.read(DOWNLOAD_CHUNK):
+            yield chunk
+
+
+def iter_gzip_chunks(path):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)   # wbits=31 -> gzip container
+    for chunk in iter_file_chunks(path):
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+class ZipStreamSink(io.RawIOBase):
+    """
+    Write-only, unseekable sink for zipfile; the bytes written so far are
+    collected with drain() so the archive can be yielded as it is built.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        return len(data)
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def iter_zip_chunks(paths):
+    sink = ZipStreamSink()
+
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for path in paths:
+            with archive.open(os.path.basename(path), "w") as entry:
+                for chunk in iter_file_chunks(path):
+                    entry.write(chunk)
+                    if len(sink.buffer) >= DOWNLOAD_CHUNK:
+                        yield sink.drain()
+            yield sink.drain()
+
+    yield sink.drain()   # central directory
+
+
+@server.route("/download/<country>/bundle.zip")
+def download_bundle(country):
+    filenames = listed_raw_logs(country)
+
+    weeks = request.args.get("weeks", type=int)
+    if weeks:
+        filenames = filenames[-weeks:]
+
+    paths = [os.path.join(DATA_ROOT, country, name) for name in filenames
+             if os.path.isfile(os.path.join(DATA_ROOT, country, name))]
+    if not paths:
+        abort(404)
+
+    return Response(
+        stream_with_context(iter_zip_chunks(paths)),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{country}_raw_logs.zip"'},
+    )
+
+
+@server.route("/download/<country>/<filename>")
+def download_raw_log(country, filename):
+    path = resolve_download_path(country, filename)
+    stat = os.stat(path)
+
+    # Resumes (Range) get the identity bytes so offsets stay meaningful
+    if request.range is None and "gzip" in request.accept_encodings:
+        etag = f"{stat.st_mtime_ns:x}-{stat.st_size:x}-gz"
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(stream_with_context(iter_gzip_chunks(path)), mimetype="text/plain")
+            response.headers["Content-Encoding"] = "gzip"
+            response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        response.set_etag(etag)
+        response.vary.add("Accept-Encoding")
+        return response
+
+    response = send_file(path, as_attachment=True, download_name=filename,
+                         conditional=True, etag=f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+if BACKGROUND_JOBS:
+    start_warmup()
+    start_snapshot_watcher()
+
 app.layout = dbc.Container([
 
+    # Polls the background warm-up until every dataset has been loaded
+    dcc.Interval(id="warmup-interval", interval=3000),
+    dcc.Store(id="warmup-store"),
+
+    # Picks up snapshots swapped in by the watcher without a page reload
+    dcc.Interval(id="snapshot-interval", interval=10000),
+
     dbc.Row([
         dbc.Col([
             
@@ -1566,8 +3430,6 @@ app.layout = dbc.Container([
 
 def get_gauge_values(ticker, country, df):
 
-    df.columns = df.columns.str.strip()
-
     row = df[df["Ticker"] == ticker]
 
     if not row.empty:
@@ -1575,254 +3437,251 @@ def get_gauge_values(ticker, country, df):
         volume_raw = row["Volume Indicator"].values[0]
         beta_raw = row["Beta Risk"].values[0]
 
-        volume = 0 if str(volume_raw).strip().upper() == "UNKNOWN" else float(volume_raw)
-        beta = -5 if str(beta_raw).strip().upper() == "UNKNOWN" else float(beta_raw)
+        # NaN is the ingest-time "UNKNOWN" sentinel
+        volume = 0 if pd.isna(volume_raw) else float(volume_raw)
+        beta = -5 if pd.isna(beta_raw) else float(beta_raw)
 
         # Clamp values
         volume = max(0, min(volume, 10))
         beta = max(-5, min(beta, 5))
 
+        volume_raw_actual = "UNKNOWN" if pd.isna(volume_raw_actual) else f"{volume_raw_actual:.0f}"
+        beta_raw = "UNKNOWN" if pd.isna(beta_raw) else float(beta_raw)
+
         return volume, beta, volume_raw_actual, beta_raw
 
-    return 0, 5  # Fallback values
+    return 0, 5, "UNKNOWN", "UNKNOWN"  # Fallback values
     
  
-def get_buysell_signals(ticker, country, df_buysell):
+def get_buysell_signals(ticker, country, df_buysell, buysell_index):
 
-    filtered = df_buysell[df_buysell["Ticker"] == ticker].copy()
+    # Ledger is sorted by ticker, so a ticker's trades are one contiguous slice
+    if ticker not in buysell_index:
+        return []
 
-    if not filtered.empty:
-        total_profit = filtered["Profit"].sum()
-        summary_row = {
-            "Profit": round(total_profit, 2), "is_summary": True
-        }
-        filtered = pd.concat([filtered, pd.DataFrame([summary_row])], ignore_index=True)
+    start, end, total_profit = buysell_index[ticker]
+    records = df_buysell.iloc[start:end].to_dict("records")
+    records.append({"Profit": round(total_profit, 2), "is_summary": True})
 
-    return filtered.to_dict("records")
+    return records
     
 @app.callback(
-    Output("line-graph", "figure"),
-    Output("macd-graph", "figure"),
-    Output("rsi-graph", "figure"),
-    Output("ema-graph", "figure"),
+    Output("dynamic-tab", "label"),
     Output("buy-sell-table", "rowData"),
     Output("volume-gauge", "value"),
     Output("beta-gauge", "value"),
-    Output("dynamic-tab", "label"),
-    Output("news_articles", "rowData"),
-    Output("current-price", "children"),
-    Output("52weeklow-price", "children"),
-    Output("52weekhigh-price", "children"),
     Output("volume-raw", "children"),
     Output("beta-raw", "children"),
     Input("company_industry_list", "selectedRows"),
     State("country-store", "data"),
-    State("store-df-batch", "data"),
-    State("store-df-buysell", "data"),
+    State("store-dataset-key", "data"),
     prevent_initial_call=True
 )
-def update_stock_chart(selected_rows, country, df_data, df_buysell_data):
+def update_stock_signals(selected_rows, country, dataset_key):
 
-    if selected_rows:
-        ticker = selected_rows[0]['Ticker']
-        selected_company = selected_rows[0]['Name']
+    # Served from the in-process dataset, so this part of Pro Analysis shows up first
+    if not selected_rows:
+        return "No Selection", [], 0, 0, 0.00, "UNKNOWN"
 
-        try:
-            hist = yf.download(ticker, period="1y", interval="1d", auto_adjust=False, progress=False)
-            hist.reset_index(inplace=True)
-            hist.columns = [col if isinstance(col, str) else col[0] for col in hist.columns]
-            hist.rename(columns={"Date": "Datetime"}, inplace=True)
-
-            if hist.empty:
-                empty_fig = px.line(title=f"No data available for {ticker}")
-                return empty_fig, empty_fig, empty_fig, empty_fig, [], 0, 0, "No Selection", [], 0.00, 0.00, 0.00, 0.00, "UNKNOWN"
-
-            # ── Line Chart
-            high_52week = hist["High"].max()
-            low_52week = hist["Low"].min()
-
-            min_close = hist['Close'].min()
-            max_close = hist['Close'].max()
-            buffer = (max_close - min_close) * 0.05
-            y_range = [min_close - buffer, max_close + buffer]
-
-            fig_line = px.line(hist, x="Datetime", y="Close")
-            fig_line.update_traces(
-                fill='tozeroy',
-                fillcolor='rgba(214,235,255,0.5)',
-                mode="lines",
-                line=dict(color="#78afd9")
-            )
-            fig_line.update_layout(
-                title=f"{ticker}: {selected_company}",
-                plot_bgcolor="#ffffff",
-                paper_bgcolor="#ffffff",
-                font=dict(family="Segoe UI", size=14),
-                margin=dict(t=60, l=40, r=20, b=40),
-                xaxis=graph_properties,
-                yaxis={**graph_properties, "range": y_range}
-            )
+    ticker = selected_rows[0]['Ticker']
+    selected_company = selected_rows[0]['Name']
 
-            # ────────────────────────────────────────────────
-            # NEW: Generate MACD, RSI, EMA using helper
-            # ────────────────────────────────────────────────
-            fig_macd, fig_rsi, fig_ema = generate_indicator_charts(
-                hist, ticker, selected_company, graph_properties
-            )
+    try:
+        # ── Load DataFrames
+        df, df_buysell, *_, buysell_index = get_dataset(dataset_key)
 
-            # ── Load DataFrames
-            df = pd.DataFrame(df_data)
-            df_buysell = pd.DataFrame(df_buysell_data)
-
-            # ── Buy/Sell Signals
-            signal_data = get_buysell_signals(ticker, country, df_buysell)
-
-            # ── Gauges
-            volume_val, beta_val, volume_raw, beta_raw = get_gauge_values(ticker, country, df)
-
-            # ── News
-            news_data = get_news_data(ticker)
-
-            # ── Last Close
-            last_close = hist["Close"].iloc[-1]
-
-            return (
-                fig_line,
-                fig_macd,
-                fig_rsi,
-                fig_ema,
-                signal_data,
-                volume_val,
-                beta_val,
-                selected_company,
-                news_data,
-                f"{last_close:.2f}",
-                f"{low_52week:.2f}",
-                f"{high_52week:.2f}",
-                volume_raw,
-                beta_raw
-            )
+        # ── Buy/Sell Signals
+        signal_data = get_buysell_signals(ticker, country, df_buysell, buysell_index)
 
-        except Exception as e:
-            error_fig = px.line(title=f"Error: {e}")
-            return (
-                error_fig, error_fig, error_fig, error_fig,
-                [], 0, 0, "No Selection", [],
-                0.00, 0.00, 0.00, 0.00, "UNKNOWN"
-            )
+        # ── Gauges
+        volume_val, beta_val, volume_raw, beta_raw = get_gauge_values(ticker, country, df)
 
-    return (
-        go.Figure(), go.Figure(), go.Figure(), go.Figure(),
-        [], 0, 0, "No Selection", [],
-        0.00, 0.00, 0.00, 0.00, "UNKNOWN"
-    )
+    except Exception as e:
+        print(f"⚠ Could not load signals for {ticker}: {e}")
+        return selected_company, [], 0, 5, "UNKNOWN", "UNKNOWN"
+
+    return selected_company, signal_data, volume_val, beta_val, volume_raw, beta_raw
+
+
+@app.callback(
+    Output("stock-price-bars", "data"),
+    Input("company_industry_list", "selectedRows"),
+    background=True,
+    progress=[
+        Output("line-graph", "figure"),
+        Output("current-price", "children"),
+        Output("52weeklow-price", "children"),
+        Output("52weekhigh-price", "children"),
+    ],
+    progress_default=[no_update, no_update, no_update, no_update],
+    interval=250,
+    # Selecting another row cancels the running job automatically; so does switching country
+    cancel=[Input("country-store", "data")],
+    prevent_initial_call=True
+)
+def update_stock_chart(set_progress, selected_rows):
+
+    if not selected_rows:
+        set_progress((go.Figure(), 0.00, 0.00, 0.00))
+        return None
+
+    ticker = selected_rows[0]['Ticker']
+    selected_company = selected_rows[0]['Name']
+
+    try:
+        hist = get_price_history(ticker, period="1y", interval="1d")
+
+        if hist.empty:
+            empty_fig = px.line(title=f"No data available for {ticker}")
+            set_progress((empty_fig, 0.00, 0.00, 0.00))
+            return None
+
+        hist = hist.reset_index()
+        hist.columns = [col if isinstance(col, str) else col[0] for col in hist.columns]
+        hist.rename(columns={"Date": "Datetime"}, inplace=True)
+
+        # ── Line Chart
+        high_52week = hist["High"].max()
+        low_52week = hist["Low"].min()
+
+        min_close = hist['Close'].min()
+        max_close = hist['Close'].max()
+        buffer = (max_close - min_close) * 0.05
+        y_range = [min_close - buffer, max_close + buffer]
+
+        fig_line = go.Figure(line_trace(
+            hist["Datetime"], hist["Close"],
+            fill='tozeroy',
+            fillcolor='rgba(214,235,255,0.5)',
+            mode="lines",
+            line=dict(color="#78afd9")
+        ))
+        fig_line.update_layout(
+            title=f"{ticker}: {selected_company}",
+            plot_bgcolor="#ffffff",
+            paper_bgcolor="#ffffff",
+            font=dict(family="Segoe UI", size=14),
+            margin=dict(t=60, l=40, r=20, b=40),
+            xaxis={**graph_properties, "title": "Datetime"},
+            yaxis={**graph_properties, "range": y_range, "title": "Close"}
+        )
+        compact_figure(fig_line)
 
+        # ── Last Close
+        last_close = hist["Close"].iloc[-1]
 
+        # Price chart and 52-week stats go out before the indicators are built
+        set_progress((fig_line, f"{last_close:.2f}", f"{low_52week:.2f}", f"{high_52week:.2f}"))
 
-def generate_indicator_charts(hist, ticker, selected_company, graph_properties):
+        # MACD, RSI and EMA are drawn clientside from these bars
+        return price_bars_payload(hist, ticker, selected_company)
+
+    except Exception as e:
+        error_fig = px.line(title=f"Error: {e}")
+        set_progress((error_fig, 0.00, 0.00, 0.00))
+        return None
+
+
+app.clientside_callback(
+    ClientsideFunction(namespace="indicators", function_name="zoom"),
+    Output("stock-chart-range", "data"),
+    Input("stock-price-bars", "data"),
+    Input("line-graph", "relayoutData"),
+    Input("macd-graph", "relayoutData"),
+    Input("rsi-graph", "relayoutData"),
+    Input("ema-graph", "relayoutData"),
+    prevent_initial_call=True
+)
+
+app.clientside_callback(
+    ClientsideFunction(namespace="indicators", function_name="render"),
+    Output("macd-graph", "figure"),
+    Output("rsi-graph", "figure"),
+    Output("ema-graph", "figure"),
+    Input("stock-price-bars", "data"),
+    Input("stock-chart-range", "data"),
+    *[Input(f"indicator-{key.replace('_', '-')}", "value") for key in CHART_INDICATOR_PARAMS],
+)
+
+
+@app.callback(
+    Output("news_articles", "rowData"),
+    Input("company_industry_list", "selectedRows"),
+    background=True,
+    cancel=[Input("country-store", "data")],
+    prevent_initial_call=True
+)
+def update_stock_news(selected_rows):
+
+    if not selected_rows:
+        return []
+
+    return get_news_data(selected_rows[0]['Ticker'])
+
+
+
+def json_floats(values, decimals=4):
+    values = np.round(np.asarray(values, dtype=float), decimals)
+    return [None if np.isnan(value) else value for value in values.tolist()]
+
+
+def price_bars_payload(hist, ticker, selected_company):
     """
-    Returns: fig_macd, fig_rsi, fig_ema
+    Compact OHLCV for assets/indicators.js, plus the default-parameter
+    indicators from the ticker's stored state.
     """
+    closes = pd.Series(hist['Close'].to_numpy(dtype=float), index=pd.DatetimeIndex(hist['Datetime']))
+    indicators = get_chart_indicators(ticker, closes)
+
+    return {
+        "ticker": ticker,
+        "title": f"{ticker}: {selected_company}",
+        "t": compact_x(hist['Datetime'])[0].astype("int64").tolist(),
+        "open": json_floats(hist['Open']),
+        "high": json_floats(hist['High']),
+        "low": json_floats(hist['Low']),
+        "close": json_floats(hist['Close']),
+        "volume": json_floats(hist['Volume'], 0),
+        "params": CHART_INDICATOR_PARAMS,
+        "indicators": {col: json_floats(indicators[col]) for col in INDICATOR_COLUMNS},
+    }
 
-    # ── EMA
-    hist['EMA_10'] = hist['Close'].ewm(span=10, adjust=False).mean()
-    hist['EMA_30'] = hist['Close'].ewm(span=30, adjust=False).mean()
-
-    fig_ema = go.Figure([
-        go.Scatter(x=hist['Datetime'], y=hist['Close'], mode='lines', name='Close Price',
-                   line=dict(color="#78afd9"), fill='tozeroy', fillcolor='rgba(214,235,255,0.5)'),
-        go.Scatter(x=hist['Datetime'], y=hist['EMA_10'], mode='lines', name='10-Day EMA',
-                   line=dict(color='orange', dash='dot')),
-        go.Scatter(x=hist['Datetime'], y=hist['EMA_30'], mode='lines', name='30-Day EMA',
-                   line=dict(color='green', dash='dot'))
-    ])
-    fig_ema.update_layout(
-        title=f"{ticker}: {selected_company}",
-        plot_bgcolor='white',
-        legend=dict(orientation="h", yanchor="top", y=1.2, xanchor="right", x=1)
-    )
-    fig_ema.update_xaxes(**graph_properties)
-    fig_ema.update_yaxes(**graph_properties)
-
-    # ── RSI
-    delta = hist['Close'].diff()
-    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
-    loss = -delta.where(delta < 0, 0).rolling(window=14).mean()
-    rs = gain / loss
-    hist['RSI'] = 100 - (100 / (1 + rs))
-
-    fig_rsi = go.Figure([
-        go.Scatter(x=hist['Datetime'], y=hist['RSI'], mode='lines', name='RSI',
-                   line=dict(color="#78afd9"), fill='tozeroy', fillcolor='rgba(214,235,255,0.5)'),
-        go.Scatter(x=hist['Datetime'], y=[70]*len(hist), mode='lines', name='Overbought (70)',
-                   line=dict(dash='dot', color='grey')),
-        go.Scatter(x=hist['Datetime'], y=[30]*len(hist), mode='lines', name='Oversold (30)',
-                   line=dict(dash='dot', color='green'))
-    ])
-    fig_rsi.update_layout(
-        title=f"{ticker}: {selected_company}",
-        plot_bgcolor='white',
-        legend=dict(orientation="h", yanchor="top", y=1.2, xanchor="right", x=1)
-    )
-    fig_rsi.update_xaxes(**graph_properties)
-    fig_rsi.update_yaxes(**graph_properties)
-
-    # ── MACD
-    exp1 = hist['Close'].ewm(span=12, adjust=False).mean()
-    exp2 = hist['Close'].ewm(span=26, adjust=False).mean()
-    hist['MACD'] = exp1 - exp2
-    hist['Signal Line'] = hist['MACD'].ewm(span=9, adjust=False).mean()
-    hist['MACD Histogram'] = hist['MACD'] - hist['Signal Line']
-
-    # Smooth histogram
-    x = np.arange(len(hist))
-    y = hist['MACD Histogram'].values
-    spline = make_interp_spline(x, y, k=3)
-    x_smooth = np.linspace(x.min(), x.max(), len(hist))
-    y_smooth = spline(x_smooth)
-
-    fig_macd = go.Figure([
-        go.Scatter(x=hist['Datetime'], y=hist['MACD'], mode='lines', name='MACD',
-                   line=dict(color='green')),
-        go.Scatter(x=hist['Datetime'], y=hist['Signal Line'], mode='lines', name='Signal Line',
-                   line=dict(color='grey', dash='dot')),
-        go.Scatter(x=hist['Datetime'], y=y_smooth, mode='lines', name='Momentum',
-                   fill='tozeroy', fillcolor='rgba(214,235,255,0.5)', line=dict(color="#78afd9"))
-    ])
-    fig_macd.update_layout(
-        title=f"{ticker}: {selected_company}",
-        plot_bgcolor='white',
-        legend=dict(orientation="h", yanchor="top", y=1.2, xanchor="right", x=1)
-    )
-    fig_macd.update_xaxes(**graph_properties)
-    fig_macd.update_yaxes(**graph_properties)
 
-    return fig_macd, fig_rsi, fig_ema
 
 
 
 
 
 
+# ---------------------------------------------------
+# News relevance
+# ---------------------------------------------------
+# A company's keywords (from its Yahoo name / sector / industry) are compiled
+# once into an Aho-Corasick automaton and cached by that text, so scoring an
+# article is one scan over its title and summary however many keywords there
+# are, and a whole batch is scored in one linear pass. At a few dozen words
+# per article and up to ~20 keywords that is no faster than plain substring
+# checks (see benchmarks/news_relevance.py); its cost just does not grow with
+# the keyword count.
+KEYWORD_STOPWORDS = {
+    'plc', 'ord', 'gbp', 'limited', 'inc', 'group', 'corporation', 'company',
+    'one', '&', 'co', 'llc', 'ltd', 'holdings', 'stock', 'share', 'unit', 'other'
+}
+KEYWORD_PUNCTUATION = re.compile(r'[^\w\s]')
+KEYWORD_CURRENCY_CODE = re.compile(r'[a-z]{3}\d*\.?\d*')   # currency codes like gbp0001
 
 
-# Function to retrieve data for multiple ticker symbols
 def clean_keywords(raw_text):
-    stopwords = {
-        'plc', 'ord', 'gbp', 'limited', 'inc', 'group', 'corporation', 'company',
-        'one', '&', 'co', 'llc', 'ltd', 'holdings', 'stock', 'share', 'unit', 'other'
-    }
-
-    cleaned_text = re.sub(r'[^\w\s]', ' ', raw_text.lower())  # Remove punctuation
+    cleaned_text = KEYWORD_PUNCTUATION.sub(' ', raw_text.lower())  # Remove punctuation
     tokens = cleaned_text.split()
 
     filtered_tokens = []
     for t in tokens:
-        if t in stopwords:
+        if t in KEYWORD_STOPWORDS:
             continue
         if t.isnumeric():  # Remove pure digits
             continue
-        if re.match(r'^[a-z]{3}\d*\.?\d*$', t):  # Remove currency codes like gbp0001
+        if KEYWORD_CURRENCY_CODE.fullmatch(t):
             continue
         if len(t) <= 2:
             continue
@@ -1831,136 +3690,274 @@ def clean_keywords(raw_text):
     return filtered_tokens
 
 
+class RelevanceMatcher:
+    """
+    Scores text against a set of keywords (substring matches, case-insensitive).
+    """
+
+    TITLE_WEIGHT = 2
+
+    def __init__(self, keywords):
+        self.keywords = sorted(set(keywords))
+        self.automaton = None
+        if self.keywords:
+            self.automaton = ahocorasick.Automaton()
+            for index, keyword in enumerate(self.keywords):
+                self.automaton.add_word(keyword, index)
+            self.automaton.make_automaton()
+
+    def hits(self, text):
+        # Indexes of the keywords occurring anywhere in text (overlapping matches included)
+        return {index for _, index in self.automaton.iter(text.lower())}
+
+    def score(self, title, summary=""):
+        """
+        0 if no keyword occurs; otherwise the share of keywords found, with title hits counting double.
+        A matcher without keywords scores everything 1.
+        """
+        if self.automaton is None:
+            return 1.0
+        in_title = self.hits(title)
+        in_summary = self.hits(summary) - in_title if summary else set()
+        return (self.TITLE_WEIGHT * len(in_title) + len(in_summary)) / (self.TITLE_WEIGHT * len(self.keywords))
+
+    def rank(self, articles, text=lambda article: (article.get("title", ""), article.get("summary", ""))):
+        """
+        Returns [(score, article)] for the articles with a score above 0, best first
+        (get_yahoo_news only uses it as a filter; the news grid is ordered by date).
+        text(article) gives its (title, summary).
+        """
+        scored = [(self.score(*text(article)), article) for article in articles]
+        return sorted([item for item in scored if item[0] > 0], key=lambda item: item[0], reverse=True)
+
+
+@functools.lru_cache(maxsize=2048)
+def relevance_matcher(raw_text):
+    # Keyed by the company's name / sector text, so effectively one compiled matcher per ticker
+    return RelevanceMatcher(clean_keywords(raw_text))
+
+
+# Per-source timeouts, each capped at NEWS_FETCH_DEADLINE
+NEWS_SOURCE_TIMEOUTS = {"investegate": 8, "mql5": 6, "yahoo": 6}
+
+
+def news_sources(ticker_symbol):
+    """
+    Returns {source: fetch function} for the sources covering ticker_symbol,
+    exchange feeds first so they win when the same story is de-duplicated.
+    """
+    if ticker_symbol.endswith(".L"):
+        sources = {"investegate": lambda: get_rns_news(ticker_symbol)}
+    else:
+        sources = {"mql5": lambda: get_cached_news(ticker_symbol, "mql5")}
+    sources["yahoo"] = lambda: get_cached_news(ticker_symbol, "yahoo")
+    return sources
+
+
 def get_news_data(ticker_symbol):
-    search_url = "https://query2.finance.yahoo.com/v1/finance/search"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'
-    }
+    # Every source side by side; one that misses its timeout is flagged as pending
+    sources = news_sources(ticker_symbol)
+    fetched, failed = fetch_concurrently({
+        name: (fetch, min(NEWS_SOURCE_TIMEOUTS[name], NEWS_FETCH_DEADLINE))
+        for name, fetch in sources.items()
+    })
 
-    news_data = []
+    news_data = merge_news(*(fetched[name] for name in sources if name in fetched))
 
-    try:
-        # Step 1: Initial metadata request
-        response = requests.get(search_url, params={"q": ticker_symbol}, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        #print(data)
-        quote = data.get('quotes', [{}])[0]
+    for name, error in failed.items():
+        if not isinstance(error, FutureTimeoutError):
+            print(f"❌ Error fetching {name} news for {ticker_symbol}: {error}")
 
-        longname = quote.get('longname', "")
-        shortname = quote.get('shortname', "")
-        sector = quote.get('sector', "")
-        industry = quote.get('industry', "")
+    if any(isinstance(error, FutureTimeoutError) for error in failed.values()):
+        news_data.insert(0, pending_news_row(ticker_symbol))
 
-        raw_text = f"{longname} {shortname} {sector} {industry}"
-        sector_keywords = list(set(clean_keywords(raw_text)))
+    return news_data
+
+
+def news_link_parts(link):
+    # News rows carry their link as '<a href="url" ...>title</a>'
+    match = re.match(r'<a href="([^"]*)"[^>]*>(.*)</a>', link, re.DOTALL)
+    return match.groups() if match else ("", link)
 
-        #print(f"🔍 Using refined keywords for filtering → {sector_keywords}")
-        
-        news_response = requests.get(
-            f"https://query2.finance.yahoo.com/v1/finance/search?q={longname}",
-            headers=headers
-        )
-        
-        news_response.raise_for_status()
-        news_json = news_response.json()
-        news_articles = news_json.get("news", [])
 
-        local_timezone = tzlocal.get_localzone()
+def news_identity(item):
+    """
+    Returns (url, title) of a news row, normalised for de-duplication.
+    """
+    url, title = news_link_parts(item["link"])
+    url = url.split("#")[0].rstrip("/").lower()
+    title = re.sub(r'\W+', ' ', title).strip().lower()
+    return url, title
 
-        def is_sector_relevant(article, keywords):
-            text = (article.get("title", "") + article.get("summary", "")).lower()
-            return any(kw in text for kw in keywords)
 
-        for article in news_articles:
-            if sector_keywords and not is_sector_relevant(article, sector_keywords):
+def merge_news(*sources):
+    """
+    Concatenates news sources, earlier sources winning. A row is dropped if
+    its link was already seen, or if an earlier source had the same title on
+    the same day. Titles are not compared within a source, because recurring
+    RNS titles ("Transaction in Own Shares", "Form 8.3 - ...") are separate
+    announcements.
+    """
+    news_data, seen_urls, seen_titles = [], set(), set()
+    for source in sources:
+        source_titles = set()
+        for item in source:
+            url, title = news_identity(item)
+            story = (title, pd.Timestamp(item["Date"]).date())
+            if (url and url in seen_urls) or (title and story in seen_titles):
                 continue
+            seen_urls.add(url)
+            source_titles.add(story)
+            news_data.append(item)
+        seen_titles |= source_titles
 
-            news_title = article.get("title", "")
-            publisher = article.get("publisher", "")
-            news_link = article.get("link", "")
-            pub_date_unix = article.get("providerPublishTime", 0)
-            related_tickers = article.get("relatedTickers", [])
+    # Sort all news by date (most recent first)
+    news_data.sort(key=lambda x: x["Date"], reverse=True)
+    return news_data
 
-            pub_date = datetime.fromtimestamp(pub_date_unix, local_timezone)
-            formatted_link = f'<a href="{news_link}" target="_blank">{news_title}</a>'
-            actual_ticker = related_tickers[0] if related_tickers else ticker_symbol
 
-            news_data.append({
-                "Date": pub_date,
-                "Ticker": actual_ticker,
-                "link": formatted_link,
-                "publisher": publisher
-            })
+def pending_news_row(ticker_symbol):
+    return {
+        "Date": datetime.now(tzlocal.get_localzone()),
+        "Ticker": ticker_symbol,
+        "link": "_Some news sources are still loading - reselect the company to refresh_",
+        "publisher": ""
+    }
 
-        if ticker_symbol.endswith(".L"):
-            news_items = extract_rns_news(ticker_symbol)
-            news_data.extend(news_items)
-        else:
-            news_items = extract_us_stock_news(ticker_symbol)
-            news_data.extend(news_items)
 
-        # Step 4: Sort all news by date (most recent first)
-        news_data.sort(key=lambda x: x["Date"], reverse=True)
-        
-        return news_data
+def get_yahoo_news(ticker_symbol):
+    news_data = []
 
-    except Exception as e:
-        print(f"❌ Error fetching news for {ticker_symbol}: {e}")
-        return []
+    # Step 1: Initial metadata request
+    data = market_data_provider.search(ticker_symbol)
+    #print(data)
+    quote = data.get('quotes', [{}])[0]
 
+    longname = quote.get('longname', "")
+    shortname = quote.get('shortname', "")
+    sector = quote.get('sector', "")
+    industry = quote.get('industry', "")
 
+    raw_text = f"{longname} {shortname} {sector} {industry}"
+    matcher = relevance_matcher(raw_text)
 
-def extract_rns_news(ticker: str, per_page: int = 300):
-    # Remove '.L' suffix if present
-    news_rns = []
+    #print(f"🔍 Using refined keywords for filtering → {matcher.keywords}")
     
-    if ticker.endswith(".L"):
-        actual_ticker = ticker.removesuffix(".L")
+    news_json = market_data_provider.search(longname)
+    news_articles = news_json.get("news", [])
+
+    local_timezone = tzlocal.get_localzone()
+
+    # Articles matching none of the company's keywords are dropped; merge_news orders the rest by date
+    for _, article in matcher.rank(news_articles):
+        news_title = article.get("title", "")
+        publisher = article.get("publisher", "")
+        news_link = article.get("link", "")
+        pub_date_unix = article.get("providerPublishTime", 0)
+        related_tickers = article.get("relatedTickers", [])
+
+        pub_date = datetime.fromtimestamp(pub_date_unix, local_timezone)
+        formatted_link = f'<a href="{news_link}" target="_blank">{news_title}</a>'
+        actual_ticker = related_tickers[0] if related_tickers else ticker_symbol
+
+        news_data.append({
+            "Date": pub_date,
+            "Ticker": actual_ticker,
+            "link": formatted_link,
+            "publisher": publisher
+        })
 
-        url = f"https://www.investegate.co.uk/company/{actual_ticker}?perPage={per_page}"
-        headers = {
-            "User-Agent": "Mozilla/5.0"
-        }
+    return news_data
 
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
-            raise Exception(f"Failed to fetch data for {ticker}. Status code: {response.status_code}")
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        table = soup.find("table", class_="table-investegate")
-        if not table:
-            raise Exception("Could not find the expected table on the page.")
 
-        
-        rows = table.find("tbody").find_all("tr")
+def rns_news_url(ticker: str, per_page: int = 300):
+    # Remove '.L' suffix if present
+    return f"https://www.investegate.co.uk/company/{ticker.removesuffix('.L')}?perPage={per_page}"
+
+
+# The scraped pages are large, but only one table / list on each is news:
+# that fragment is cut out of the raw HTML and parsed on its own with lxml,
+# and timestamps are read with precompiled patterns instead of strptime.
+RNS_TIMESTAMP = re.compile(r"(\d{1,2}) ([A-Za-z]{3}) (\d{4}) (\d{1,2}):(\d{2}) ?([AaPp][Mm])")
+MQL5_TIMESTAMP = re.compile(r"(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2})Z")
+MONTHS = {name: number for number, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1)}
+LONDON = ZoneInfo("Europe/London")
+UTC = ZoneInfo("UTC")
+
+
+def html_fragment(page, tag, class_name):
+    """
+    Parses just the first <tag> element with class_name; None if the page has
+    none (or it is never closed). Nested <tag>s inside it are kept.
+    """
+    opening = re.search(rf'<{tag}\b[^>]*\bclass=["\'](?:[^"\']*\s)?{re.escape(class_name)}[\s"\']', page)
+    if not opening:
+        return None
+
+    depth = 0
+    for match in re.compile(rf'<(/?){tag}\b[^>]*>', re.IGNORECASE).finditer(page, opening.start()):
+        depth += -1 if match.group(1) else 1
+        if depth == 0:
+            return lxml.html.fragment_fromstring(page[opening.start():match.end()])
+    return None
+
+
+def has_class(element, name):
+    return name in (element.get("class") or "").split()
+
+
+def element_text(element):
+    # Same as BeautifulSoup's get_text(strip=True)
+    return "".join(text.strip() for text in element.itertext())
+
+
+def parse_rns_timestamp(date_str, time_str):
+    match = RNS_TIMESTAMP.fullmatch(f"{date_str} {time_str}")
+    if not match:
+        return None
+    day, month, year, hour, minute, meridiem = match.groups()
+    month, hour = MONTHS.get(month.lower()), int(hour)
+    if month is None or not 1 <= hour <= 12:
+        return None
+
+    hour = hour % 12 + (12 if meridiem.lower() == "pm" else 0)
+    try:
+        return datetime(int(year), month, int(day), hour, int(minute), tzinfo=LONDON)
+    except ValueError:
+        return None
 
-        for row in rows:
-            cols = row.find_all("td")
+
+def parse_rns_page(page: str, ticker: str):
+    news_rns = []
+    
+    if ticker.endswith(".L"):
+        table = html_fragment(page, "table", "table-investegate")
+        if table is None:
+            raise Exception("Could not find the expected table on the page.")
+
+        for row in table.iter("tr"):
+            cols = row.findall("td")
             if len(cols) < 4:
                 continue
 
             # Extract and parse date and time
-            date_str = cols[0].get_text(strip=True)
-            time_str = cols[1].get_text(strip=True)
-
-            try:
-                dt = datetime.strptime(f"{date_str} {time_str}", "%d %b %Y %I:%M %p")
-                dt = dt.replace(tzinfo=ZoneInfo("Europe/London"))
-            except Exception:
+            dt = parse_rns_timestamp(element_text(cols[0]), element_text(cols[1]))
+            if dt is None:
                 continue  # Skip rows with invalid date/time
 
             # Extract publisher
-            publisher_tag = cols[2].find("a", class_="source-RNS")
-            publisher = publisher_tag.get_text(strip=True) if publisher_tag else "Unknown"
+            publisher_tag = next((a for a in cols[2].iter("a") if has_class(a, "source-RNS")), None)
+            publisher = element_text(publisher_tag) if publisher_tag is not None else "Unknown"
 
             # Extract announcement link and text
-            announcement_tag = cols[3].find("a", class_="announcement-link")
-            if not announcement_tag:
+            announcement_tag = next((a for a in cols[3].iter("a") if has_class(a, "announcement-link")), None)
+            if announcement_tag is None or announcement_tag.get("href") is None:
                 continue
 
-            href = announcement_tag["href"]
-            text = announcement_tag.get_text(strip=True)
+            href = announcement_tag.get("href")
+            text = element_text(announcement_tag)
             formatted_link = f'<a href="{href}" target="_blank">{text}</a>'
 
             news_rns.append({
@@ -1970,46 +3967,42 @@ def extract_rns_news(ticker: str, per_page: int = 300):
                 "publisher": publisher
             })
 
-        #return news_rns
     return news_rns
 
 
-def extract_us_stock_news(ticker: str):
-    news_items = []
-    url = f"https://www.mql5.com/en/quotes/stocks/{ticker.upper()}"
-    headers = {
-        "User-Agent": "Mozilla/5.0"
-    }
+def mql5_news_url(ticker: str):
+    return f"https://www.mql5.com/en/quotes/stocks/{ticker.upper()}"
 
-    response = requests.get(url, headers=headers)
-    if response.status_code != 200:
-        raise Exception(f"Failed to fetch data for {ticker}. Status code: {response.status_code}")
 
-    soup = BeautifulSoup(response.text, "html.parser")
-    news_section = soup.find("div", class_="nav-symbol__section nav-symbol__news")
-    if not news_section:
+def parse_mql5_page(page: str, ticker: str):
+    news_items = []
+    news_list = html_fragment(page, "ul", "nav-symbol__news-list")
+    if news_list is None:
         return news_items
 
-    for li in news_section.select("ul.nav-symbol__news-list li"):
+    for li in news_list.iter("li"):
         # Extract source
-        source_tag = li.find("span", class_="news-source")
-        publisher = source_tag.get("title") if source_tag else "Unknown"
+        source_tag = next((span for span in li.iter("span") if has_class(span, "news-source")), None)
+        publisher = source_tag.get("title") if source_tag is not None else "Unknown"
 
         # Extract datetime
-        time_tag = li.find("time")
+        time_tag = next(li.iter("time"), None)
+        match = MQL5_TIMESTAMP.fullmatch(time_tag.get("datetime") or "") if time_tag is not None else None
+        if not match:
+            continue
         try:
-            dt = datetime.strptime(time_tag["datetime"], "%Y-%m-%dT%H:%MZ")
-            dt = dt.replace(tzinfo=ZoneInfo("UTC"))
-        except Exception:
+            dt = datetime(*map(int, match.groups()), tzinfo=UTC)
+        except ValueError:
             continue
 
         # Extract link and title
-        title_tag = li.find("span", class_="news-title").find("a")
-        if not title_tag:
+        title_span = next((span for span in li.iter("span") if has_class(span, "news-title")), None)
+        title_tag = next(title_span.iter("a"), None) if title_span is not None else None
+        if title_tag is None or title_tag.get("href") is None:
             continue
 
-        href = title_tag["href"]
-        text = title_tag.get("title", title_tag.get_text(strip=True))
+        href = title_tag.get("href")
+        text = title_tag.get("title", element_text(title_tag))
         formatted_link = f'<a href="{href}" target="_blank">{text}</a>'
 
         news_items.append({
@@ -2022,6 +4015,377 @@ def extract_us_stock_news(ticker: str):
     return news_items
 
 
+# ---------------------------------------------------
+# News cache
+# ---------------------------------------------------
+# Articles are kept per (ticker, source) in SQLite under CACHE_ROOT. Within
+# the source's TTL (shorter while the ticker's market is open) a view costs
+# no HTTP at all; after it, scraped pages are revalidated with their
+# ETag / Last-Modified, so an unchanged page is a 304 and is not re-parsed.
+# If a refresh fails, the last stored articles are served instead.
+NEWS_CACHE_PATH = os.path.join(CACHE_ROOT, "news.sqlite")
+NEWS_CACHE_TTL = {              # source: (market open, market closed) seconds
+    "investegate": (5 * 60, 60 * 60),
+    "mql5": (10 * 60, 2 * 60 * 60),
+    "yahoo": (15 * 60, 2 * 60 * 60),
+}
+MARKET_HOURS = {
+    "UK": ("Europe/London", (8, 0), (16, 30)),
+    "US": ("America/New_York", (9, 30), (16, 0)),
+}
+
+# Scraped sources: (page url for a ticker, page parser)
+NEWS_PAGES = {
+    "investegate": (rns_news_url, parse_rns_page),
+    "mql5": (mql5_news_url, parse_mql5_page),
+}
+
+NEWS_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS news_fetches (
+    ticker TEXT NOT NULL,
+    source TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    PRIMARY KEY (ticker, source)
+);
+CREATE TABLE IF NOT EXISTS news_articles (
+    ticker TEXT NOT NULL,
+    source TEXT NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    published TEXT NOT NULL,
+    article_ticker TEXT NOT NULL,
+    link TEXT NOT NULL,
+    publisher TEXT NOT NULL,
+    PRIMARY KEY (ticker, source, url, title)
+);
+"""
+
+
+def market_is_open(ticker_symbol):
+    zone, opens, closes = MARKET_HOURS["UK" if ticker_symbol.endswith(".L") else "US"]
+    now = datetime.now(ZoneInfo(zone))
+    return now.weekday() < 5 and opens <= (now.hour, now.minute) < closes
+
+
+def news_cache_ttl(ticker_symbol, source):
+    open_ttl, closed_ttl = NEWS_CACHE_TTL[source]
+    return open_ttl if market_is_open(ticker_symbol) else closed_ttl
+
+
+def connect_news_cache():
+    # One short-lived connection per call: callbacks run in threads and forked job processes
+    os.makedirs(os.path.dirname(NEWS_CACHE_PATH), exist_ok=True)
+    conn = sqlite3.connect(NEWS_CACHE_PATH, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(NEWS_CACHE_SCHEMA)
+    return conn
+
+
+def read_news_cache(ticker_symbol, source):
+    """
+    Returns (articles, fetched_at, etag, last_modified) - articles is None if nothing is stored.
+    """
+    with closing(connect_news_cache()) as conn:
+        fetch = conn.execute(
+            "SELECT fetched_at, etag, last_modified FROM news_fetches WHERE ticker = ? AND source = ?",
+            (ticker_symbol, source)).fetchone()
+        if fetch is None:
+            return None, None, None, None
+
+        rows = conn.execute(
+            "SELECT published, article_ticker, link, publisher FROM news_articles WHERE ticker = ? AND source = ?",
+            (ticker_symbol, source)).fetchall()
+
+    articles = [{"Date": datetime.fromisoformat(published), "Ticker": article_ticker, "link": link, "publisher": publisher}
+                for published, article_ticker, link, publisher in rows]
+    return (articles, *fetch)
+
+
+def write_news_cache(ticker_symbol, source, articles, etag=None, last_modified=None):
+    rows = [(ticker_symbol, source, *news_identity(item), item["Date"].isoformat(), item["Ticker"], item["link"], item["publisher"])
+            for item in articles]
+
+    with closing(connect_news_cache()) as conn, conn:
+        conn.execute("DELETE FROM news_articles WHERE ticker = ? AND source = ?", (ticker_symbol, source))
+        # Repeats of the same story within a source collapse on the primary key
+        conn.executemany("INSERT OR IGNORE INTO news_articles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.execute("INSERT OR REPLACE INTO news_fetches VALUES (?, ?, ?, ?, ?)",
+                     (ticker_symbol, source, time.time(), etag, last_modified))
+
+
+def touch_news_cache(ticker_symbol, source):
+    with closing(connect_news_cache()) as conn, conn:
+        conn.execute("UPDATE news_fetches SET fetched_at = ? WHERE ticker = ? AND source = ?",
+                     (time.time(), ticker_symbol, source))
+
+
+def get_cached_news(ticker_symbol, source):
+    """
+    Returns the source's articles for ticker_symbol from the cache, refreshing them once the TTL has passed.
+    """
+    articles, fetched_at, etag, last_modified = read_news_cache(ticker_symbol, source)
+    if articles is not None and time.time() - fetched_at < news_cache_ttl(ticker_symbol, source):
+        return articles
+
+    try:
+        if source in NEWS_PAGES:
+            url_for, parse = NEWS_PAGES[source]
+            if articles is None:
+                etag = last_modified = None
+            page, etag, last_modified = market_data_provider.revalidate_page(url_for(ticker_symbol), etag, last_modified)
+            if page is None:
+                touch_news_cache(ticker_symbol, source)
+                return articles
+            fresh = parse(page, ticker_symbol)
+        else:
+            fresh, etag, last_modified = get_yahoo_news(ticker_symbol), None, None
+    except Exception as e:
+        if articles is None:
+            raise
+        print(f"⚠ Serving cached {source} news for {ticker_symbol}: {e}")
+        return articles
+
+    write_news_cache(ticker_symbol, source, fresh, etag, last_modified)
+    if source == "investegate":
+        index_rns_announcements(ticker_symbol, fresh)
+    return fresh
+
+
+# ---------------------------------------------------
+# RNS index
+# ---------------------------------------------------
+# An opt-in background crawler (set STOCKDASH_RNS_CRAWL_INTERVAL) walks every
+# ticker in the UK BATCH snapshot and keeps their Investegate announcements
+# in a local SQLite FTS5 index. Pro Analysis
+# reads a ticker's RNS from the index while the ticker was crawled within
+# its news TTL, and /rns/search gives full-text search across the market.
+#
+# The crawl is polite: RNS_CRAWL_WORKERS requests in flight at most, one
+# started per RNS_CRAWL_PACE seconds, each conditional on the page's ETag.
+# Once a ticker has been seen, only its latest RNS_CRAWL_RECENT rows are
+# fetched, unless all of them are new (then the full page fills the gap).
+# Tickers are handed to the pool as workers free up, so stopping the crawler
+# (or exiting the process) only waits for the tickers already in flight.
+RNS_INDEX_PATH = os.path.join(CACHE_ROOT, "rns.sqlite")
+RNS_CRAWL_INTERVAL = float(os.environ.get("STOCKDASH_RNS_CRAWL_INTERVAL", "0"))   # seconds between passes; 0 disables
+RNS_CRAWL_WORKERS = 2
+RNS_CRAWL_PACE = 0.5
+RNS_CRAWL_RECENT = 20
+
+rns_crawler_started = threading.Event()
+rns_crawler_stop = threading.Event()
+
+RNS_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rns_announcements (
+    id INTEGER PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    published TEXT NOT NULL,
+    published_ts REAL NOT NULL,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    publisher TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rns_ticker_published ON rns_announcements (ticker, published_ts);
+CREATE VIRTUAL TABLE IF NOT EXISTS rns_search USING fts5 (
+    title, ticker UNINDEXED, content='rns_announcements', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS rns_announcements_indexed AFTER INSERT ON rns_announcements BEGIN
+    INSERT INTO rns_search (rowid, title, ticker) VALUES (new.id, new.title, new.ticker);
+END;
+CREATE TABLE IF NOT EXISTS rns_crawls (
+    ticker TEXT PRIMARY KEY,
+    crawled_at REAL NOT NULL,
+    last_seen REAL,
+    etag TEXT,
+    last_modified TEXT
+);
+"""
+
+
+def connect_rns_index():
+    os.makedirs(os.path.dirname(RNS_INDEX_PATH), exist_ok=True)
+    conn = sqlite3.connect(RNS_INDEX_PATH, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(RNS_INDEX_SCHEMA)
+    return conn
+
+
+def read_rns_crawl(ticker_symbol):
+    """
+    Returns (crawled_at, last_seen, etag, last_modified); all None if the ticker was never crawled.
+    """
+    with closing(connect_rns_index()) as conn:
+        crawl = conn.execute("SELECT crawled_at, last_seen, etag, last_modified FROM rns_crawls WHERE ticker = ?",
+                             (ticker_symbol,)).fetchone()
+    return crawl or (None, None, None, None)
+
+
+def index_rns_announcements(ticker_symbol, articles, etag=None, last_modified=None):
+    """
+    Adds parsed Investegate rows to the index (known links are skipped) and records the crawl.
+    """
+    rows = []
+    for item in articles:
+        url, title = news_link_parts(item["link"])
+        rows.append((ticker_symbol, item["Date"].isoformat(), item["Date"].timestamp(), url, title, item["publisher"]))
+    newest = max((row[2] for row in rows), default=None)
+
+    with closing(connect_rns_index()) as conn, conn:
+        conn.executemany("INSERT OR IGNORE INTO rns_announcements (ticker, published, published_ts, url, title, publisher) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", rows)
+        conn.execute("""
+            INSERT INTO rns_crawls VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (ticker) DO UPDATE SET
+                crawled_at = excluded.crawled_at,
+                last_seen = max(coalesce(last_seen, 0), coalesce(excluded.last_seen, 0)),
+                etag = coalesce(excluded.etag, etag),
+                last_modified = coalesce(excluded.last_modified, last_modified)
+        """, (ticker_symbol, time.time(), newest, etag, last_modified))
+
+
+def rns_row(ticker_symbol, published, url, title, publisher):
+    return {
+        "Date": datetime.fromisoformat(published),
+        "Ticker": ticker_symbol,
+        "link": f'<a href="{url}" target="_blank">{title}</a>',
+        "publisher": publisher
+    }
+
+
+def query_rns_index(ticker_symbol, limit=300):
+    with closing(connect_rns_index()) as conn:
+        rows = conn.execute(
+            "SELECT ticker, published, url, title, publisher FROM rns_announcements "
+            "WHERE ticker = ? ORDER BY published_ts DESC LIMIT ?", (ticker_symbol, limit)).fetchall()
+    return [rns_row(*row) for row in rows]
+
+
+def search_rns(query, limit=50):
+    """
+    Full-text search over every indexed announcement title, best matches first.
+    Words are matched as prefixes; FTS5 syntax characters are ignored.
+    """
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return []
+    match = " ".join(f'"{term}"*' for term in terms)
+
+    with closing(connect_rns_index()) as conn:
+        rows = conn.execute(
+            "SELECT a.ticker, a.published, a.url, a.title, a.publisher FROM rns_search "
+            "JOIN rns_announcements a ON a.id = rns_search.rowid "
+            "WHERE rns_search MATCH ? ORDER BY bm25(rns_search), a.published_ts DESC LIMIT ?",
+            (match, limit)).fetchall()
+    return [rns_row(*row) for row in rows]
+
+
+def get_rns_news(ticker_symbol):
+    # Served from the index while the ticker's last crawl is within its news TTL
+    crawled_at, *_ = read_rns_crawl(ticker_symbol)
+    if crawled_at is not None and time.time() - crawled_at < news_cache_ttl(ticker_symbol, "investegate"):
+        return query_rns_index(ticker_symbol)
+    return get_cached_news(ticker_symbol, "investegate")
+
+
+def crawl_rns_ticker(ticker_symbol, pace):
+    _, last_seen, etag, last_modified = read_rns_crawl(ticker_symbol)
+
+    if last_seen is None:
+        pace()
+        page, _, _ = market_data_provider.revalidate_page(rns_news_url(ticker_symbol))
+        index_rns_announcements(ticker_symbol, parse_rns_page(page, ticker_symbol))
+        return
+
+    # The stored validators always belong to the short "recent" page
+    pace()
+    page, etag, last_modified = market_data_provider.revalidate_page(
+        rns_news_url(ticker_symbol, RNS_CRAWL_RECENT), etag, last_modified)
+    if page is None:
+        index_rns_announcements(ticker_symbol, [])
+        return
+    articles = parse_rns_page(page, ticker_symbol)
+
+    # Every recent row is new: there may be more since last_seen than the short page holds
+    if len(articles) >= RNS_CRAWL_RECENT and min(item["Date"].timestamp() for item in articles) > last_seen:
+        pace()
+        page, _, _ = market_data_provider.revalidate_page(rns_news_url(ticker_symbol))
+        articles = parse_rns_page(page, ticker_symbol)
+
+    index_rns_announcements(ticker_symbol, articles, etag, last_modified)
+
+
+def crawl_rns(tickers):
+    """
+    One pass over tickers. Returns the number of tickers that could not be crawled.
+    """
+    pace_lock = threading.Lock()
+    next_start = [time.monotonic()]
+
+    def pace():
+        with pace_lock:
+            slot = max(time.monotonic(), next_start[0])
+            next_start[0] = slot + RNS_CRAWL_PACE
+        if rns_crawler_stop.wait(max(0.0, slot - time.monotonic())):
+            raise InterruptedError("RNS crawler stopped")
+
+    def crawl(ticker_symbol):
+        try:
+            crawl_rns_ticker(ticker_symbol, pace)
+            return True
+        except Exception:
+            return False
+
+    failed = 0
+    in_flight = set()
+    with ThreadPoolExecutor(max_workers=RNS_CRAWL_WORKERS, thread_name_prefix="stockdash-rns",
+                            initializer=lower_thread_priority) as executor:
+        for ticker_symbol in tickers:
+            if len(in_flight) >= RNS_CRAWL_WORKERS:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                failed += sum(not future.result() for future in done)
+            if rns_crawler_stop.is_set():
+                break
+            in_flight.add(executor.submit(crawl, ticker_symbol))
+
+        failed += sum(not future.result() for future in in_flight)
+    return failed
+
+
+def run_rns_crawler():
+    while True:
+        try:
+            uk_batch = read_snapshot(os.path.join(DATA_ROOT, "UK", "BATCH.csv"), schema=normalise_batch_schema)
+            tickers = sorted(uk_batch["Ticker"].dropna().astype(str).unique())
+
+            started = time.monotonic()
+            failed = crawl_rns(tickers)
+            print(f"RNS crawl: {len(tickers) - failed}/{len(tickers)} tickers in {time.monotonic() - started:.0f}s")
+        except Exception as e:
+            print(f"⚠ RNS crawl failed: {e}")
+
+        if rns_crawler_stop.wait(RNS_CRAWL_INTERVAL):
+            return
+
+
+def start_rns_crawler():
+    if rns_crawler_started.is_set() or RNS_CRAWL_INTERVAL <= 0:
+        return
+    rns_crawler_started.set()
+
+    threading.Thread(target=run_rns_crawler, name="stockdash-rns-crawler", daemon=True).start()
+
+
+def stop_rns_crawler():
+    # Tickers in flight finish (each is bounded by HTTP_TIMEOUT), nothing new starts
+    rns_crawler_stop.set()
+
+
+if BACKGROUND_JOBS:
+    start_rns_crawler()
+
+
 
 
 @app.callback(
@@ -2051,24 +4415,15 @@ def store_advanced_filter(n, sector, industry, hold, transactions, volume, beta,
         "ask_bid_spread": ask_bid
     }
     
-@app.callback(
-    Output("advanced-filter-grid", "rowData"),
-    Input("advanced-filter-store", "data"),
-    #State("country-store", "data"),
-    Input("country-store", "data"),  # ← make this an Input, not just State
-    State("store-df-batch", "data")
-)
-def update_advanced_filtered_table(filter_data, country, df_data):
-    #df, *_ = load_country_data(country)
-    df = pd.DataFrame(df_data)
-    df.columns = df.columns.str.strip()
-
-    #filtered = df.copy()
+def filter_advanced_rows(df, filter_data):
+    """
+    Applies the Advanced Filter store's criteria to a BATCH frame.
+    """
     filtered = df
     
     # If no filter applied, return full data
     if not filter_data:
-        return filtered.to_dict("records")
+        return filtered
 
 
 
@@ -2092,8 +4447,6 @@ def update_advanced_filtered_table(filter_data, country, df_data):
 
     if "Volume Indicator" in filtered.columns:
         vol_min, vol_max = filter_data["volume_range"]
-        filtered["Volume Indicator"] = pd.to_numeric(filtered["Volume Indicator"], errors="coerce")
-
         filtered = filtered[
             (filtered["Volume Indicator"] >= vol_min) &
             (filtered["Volume Indicator"] <= vol_max)
@@ -2101,8 +4454,6 @@ def update_advanced_filtered_table(filter_data, country, df_data):
 
     if "Beta Risk" in filtered.columns:
         beta_min, beta_max = filter_data["beta_range"]
-        filtered["Beta Risk"] = pd.to_numeric(filtered["Beta Risk"], errors="coerce")
-
         filtered = filtered[
             (filtered["Beta Risk"] >= beta_min) &
             (filtered["Beta Risk"] <= beta_max)
@@ -2110,7 +4461,6 @@ def update_advanced_filtered_table(filter_data, country, df_data):
     
     if "last_price_range" in filter_data:
         price_min, price_max = filter_data["last_price_range"]
-        filtered["last Price"] = pd.to_numeric(filtered["last Price"], errors="coerce")
         filtered = filtered[
             (filtered["last Price"] >= price_min) &
             (filtered["last Price"] <= price_max)
@@ -2118,7 +4468,6 @@ def update_advanced_filtered_table(filter_data, country, df_data):
 
     if "drop_samples_range" in filter_data:
         price_min, price_max = filter_data["drop_samples_range"]
-        filtered["Dropped Samples %"] = pd.to_numeric(filtered["Dropped Samples %"], errors="coerce")
         filtered = filtered[
             (filtered["Dropped Samples %"] >= price_min) &
             (filtered["Dropped Samples %"] <= price_max)
@@ -2126,13 +4475,72 @@ def update_advanced_filtered_table(filter_data, country, df_data):
         
     if "ask_bid_spread" in filter_data:
         price_min, price_max = filter_data["ask_bid_spread"]
-        filtered["Ask-Bid Spread"] = pd.to_numeric(filtered["Ask-Bid Spread"], errors="coerce")
         filtered = filtered[
             (filtered["Ask-Bid Spread"] >= price_min) &
             (filtered["Ask-Bid Spread"] <= price_max)
         ]    
 
-    return filtered.to_dict("records")
+    return filtered
+
+
+def query_advanced_rows(filtered, start_row, end_row, sort_model):
+    """
+    One block of rows for the grid's infinite row model, ordered by AG Grid's
+    sortModel ([{"colId": ..., "sort": "asc" | "desc"}, ...]).
+    Returns (records, total row count).
+    """
+    sort_model = [s for s in (sort_model or []) if s.get("colId") in filtered.columns]
+    if sort_model:
+        # AG Grid treats blanks as the lowest value: first ascending, last descending.
+        # pandas has one na_position for all keys, so each key gets a blank flag sorted ahead of it
+        keys, by, ascending = {}, [], []
+        for i, s in enumerate(sort_model):
+            values = filtered[s["colId"]].reset_index(drop=True)
+            asc = s.get("sort") != "desc"
+            keys[f"blank{i}"], keys[f"value{i}"] = values.isna(), values
+            by += [f"blank{i}", f"value{i}"]
+            ascending += [not asc, asc]
+
+        # Stable, so ties keep the BATCH order like the grid's own sort
+        order = pd.DataFrame(keys).sort_values(by, ascending=ascending, kind="stable").index
+        filtered = filtered.iloc[order]
+
+    start_row = max(int(start_row or 0), 0)
+    end_row = min(int(end_row or 0), start_row + ADVANCED_FILTER_BLOCK_SIZE)
+    return filtered.iloc[start_row:end_row].to_dict("records"), len(filtered)
+
+
+app.clientside_callback(
+    ClientsideFunction(namespace="advancedFilter", function_name="refresh"),
+    Output("advanced-filter-grid", "scrollTo"),
+    Input("advanced-filter-store", "data"),
+    Input("country-store", "data"),  # also re-sent when a new snapshot is swapped in
+    Input("store-dataset-key", "data"),
+    prevent_initial_call=True
+)
+
+
+@app.callback(
+    Output("advanced-filter-grid", "getRowsResponse"),
+    Input("advanced-filter-grid", "getRowsRequest"),
+    State("advanced-filter-store", "data"),
+    State("store-dataset-key", "data")
+)
+def serve_advanced_filter_rows(rows_request, filter_data, dataset_key):
+    if not rows_request:
+        raise PreventUpdate
+
+    # The grid can ask for its first block before the country selection has registered a
+    # dataset. Answer it with an empty block so the block is not left loading; the refresh
+    # callback purges the cache and the grid asks again once store-dataset-key is set
+    if not dataset_key:
+        return {"rowData": [], "rowCount": 0}
+
+    df, *_ = get_dataset(dataset_key)
+    filtered = filter_advanced_rows(df, filter_data)
+    rows, row_count = query_advanced_rows(filtered, rows_request.get("startRow"), rows_request.get("endRow"),
+                                          rows_request.get("sortModel"))
+    return {"rowData": rows, "rowCount": row_count}
     
 
 @app.callback(
@@ -2157,31 +4565,19 @@ def get_company_info(stock_symbol):
     # Initialize default values
     company_name_cleaned = DEFAULT_UNKNOWN
     
-    # Using Yahoo Finance API URL is more reliable than info.get
+    # Using Yahoo Finance search is more reliable than info.get
     # But it can fail to get all the require data too :(
-    yfinance_url = "https://query2.finance.yahoo.com/v1/finance/search"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36"
-    }
-    params = {"q": stock_symbol, "quotes_count": 1}
-
     try:
-        response = requests.get(yfinance_url, headers=headers, params=params)
-        
-        if response.status_code == 200:
-            data = response.json()
-            
-            # Check if data contains quotes
-            if "quotes" in data and data["quotes"]:
-                quote = data["quotes"][0]
-                
-                company_name_cleaned = re.sub(r',', ' ', quote.get('longname', DEFAULT_UNKNOWN))
-                #sector_cleaned = re.sub(r',', ' ', quote.get('sector', DEFAULT_UNKNOWN))
-                #industry_cleaned = re.sub(r'[,—]', ' ', quote.get('industry', DEFAULT_UNKNOWN))
-                #sector_industry = f"{sector_cleaned}, {industry_cleaned}"
+        data = market_data_provider.search(stock_symbol, quotes_count=1)
 
-        else:
-            print(f"yfinance_url: Error Received status code {response.status_code}")
+        # Check if data contains quotes
+        if "quotes" in data and data["quotes"]:
+            quote = data["quotes"][0]
+            
+            company_name_cleaned = re.sub(r',', ' ', quote.get('longname', DEFAULT_UNKNOWN))
+            #sector_cleaned = re.sub(r',', ' ', quote.get('sector', DEFAULT_UNKNOWN))
+            #industry_cleaned = re.sub(r'[,—]', ' ', quote.get('industry', DEFAULT_UNKNOWN))
+            #sector_industry = f"{sector_cleaned}, {industry_cleaned}"
     
     except Exception as e:
         print(f"yfinance_url: Error fetching company info for {stock_symbol}: {e}")
@@ -2218,9 +4614,7 @@ def reset_inputs(n_clicks):
     Output("taxes", "children"),
     Output("net-gain-value", "children"),
     Output("company-name", "children"),
-    Output("calculator-macd-performance-graph", "figure"),
-    Output("calculator-rsi-performance-graph", "figure"),
-    Output("calculator-ema-performance-graph", "figure"),
+    Output("calculator-price-bars", "data"),
     Output("cal-buy-price", "children"),
     Output("cal-sell-price", "children"),
     Output("cal-num-shares", "children"),
@@ -2254,28 +4648,29 @@ def calculate_metrics(n_clicks, ticker, investment, mode, buy, sell, start_date,
         trading_fees = float(trading_fees) if trading_fees else 0
         taxes = float(taxes) if taxes else 0
         fig = go.Figure()
+        price_bars = None
         calculated_buy_price = 0
         calculated_sell_price = 0
         calculated_num_shares = 0
         
         
     except Exception:
-        return "0%", "0", "0", "0", "0", "0", "No Selection", go.Figure(), go.Figure(), go.Figure(), "0", "0", "0", "0", go.Figure()
+        return "0%", "0", "0", "0", "0", "0", "No Selection", None, "0", "0", "0", "0", go.Figure()
 
     if not ticker or not isinstance(ticker, str) or not ticker.strip():
-         return "0%", "0", "0", "0", "0", "0", "No Selection", go.Figure(), go.Figure(), go.Figure(), "0", "0", "0", "0", go.Figure()
+         return "0%", "0", "0", "0", "0", "0", "No Selection", None, "0", "0", "0", "0", go.Figure()
 
     roi_percent, gain, net_gain_value, tax_amount = 0, 0, 0, 0
     
     if mode == "manual":
         if buy == 0 or sell == 0:
-            return "0%", "0", "0", "0", "0", "0", "No Selection", go.Figure(), go.Figure(), go.Figure(), "0", "0", "0", "0", go.Figure()
+            return "0%", "0", "0", "0", "0", "0", "No Selection", None, "0", "0", "0", "0", go.Figure()
             
             
     # ------------------------- # MANUAL MODE # ------------------------- 
     if mode == "manual": 
         if buy == 0 or sell == 0: 
-            return "0%", "0", "0", "0", "0", "0", "No Selection", go.Figure(), go.Figure(), go.Figure(), "0", "0", "0", "0", go.Figure() 
+            return "0%", "0", "0", "0", "0", "0", "No Selection", None, "0", "0", "0", "0", go.Figure() 
             
         # Remove buy-side trading fee 
         available_after_fee = investment - trading_fees 
@@ -2312,7 +4707,7 @@ def calculate_metrics(n_clicks, ticker, investment, mode, buy, sell, start_date,
             
         # Manual mode has no platform fees 
         total_platform_fees = 0 
-        data = yf.download(ticker, period="1y", auto_adjust=True) 
+        data = get_price_history(ticker, period="1y", auto_adjust=True) 
         calculated_buy_price = buy 
         calculated_sell_price = sell 
         calculated_num_shares = shares
@@ -2321,7 +4716,7 @@ def calculate_metrics(n_clicks, ticker, investment, mode, buy, sell, start_date,
     elif mode == "date":
         if not all([ticker, start_date, end_date]):
             print(F"MODE ERROR: ticker:{ticker}, start_date{start_date}, end_date{end_date}")
-            return "0%", "0", f"{platform_fees}", f"{trading_fees * 2}", "0", "0", "No Selection", go.Figure(), go.Figure(), go.Figure(), "0", "0", "0", "0", go.Figure()
+            return "0%", "0", f"{platform_fees}", f"{trading_fees * 2}", "0", "0", "No Selection", None, "0", "0", "0", "0", go.Figure()
             
         #check the dates are valid
         start_date_obj = pd.to_datetime(start_date)
@@ -2329,15 +4724,15 @@ def calculate_metrics(n_clicks, ticker, investment, mode, buy, sell, start_date,
         
         if end_date_obj < start_date_obj:
             print("Date error:")
-            return "0%", "0", f"{platform_fees}", f"{trading_fees * 2}", "0", "0", "No Selection", go.Figure(), go.Figure(), go.Figure(), "0", "0", "0", "0", go.Figure()
+            return "0%", "0", f"{platform_fees}", f"{trading_fees * 2}", "0", "0", "No Selection", None, "0", "0", "0", "0", go.Figure()
 
         try:
             # 🔍 Get historical data
-            data = yf.download(ticker, start=start_date, end=end_date, auto_adjust=True)
+            data = get_price_history(ticker, start=start_date, end=end_date, auto_adjust=True)
 
             if data.empty or "Close" not in data.columns:
                 print(f"{data}")
-                return "0%", "0", f"{platform_fees}", f"{trading_fees * 2}", "0", "0", "No Selection", go.Figure(), go.Figure(), go.Figure(), "0", "0", "0", "0", go.Figure()
+                return "0%", "0", f"{platform_fees}", f"{trading_fees * 2}", "0", "0", "No Selection", None, "0", "0", "0", "0", go.Figure()
 
             buy = float(data['Close'].iloc[0].item())     # ✅ Preferred
             sell = float(data['Close'].iloc[-1].item())   # ✅ Last row safely too
@@ -2375,7 +4770,7 @@ def calculate_metrics(n_clicks, ticker, investment, mode, buy, sell, start_date,
             calculated_num_shares = shares
 
         except Exception:
-            return "0%", "0", f"{total_platform_fees}", f"{trading_fees * 2}", "0", "0", "No Selection", go.Figure(), go.Figure(), go.Figure(), "0", "0", "0", "0", go.Figure()
+            return "0%", "0", f"{total_platform_fees}", f"{trading_fees * 2}", "0", "0", "No Selection", None, "0", "0", "0", "0", go.Figure()
         
         
     company_long_name = get_company_info(ticker)
@@ -2385,13 +4780,13 @@ def calculate_metrics(n_clicks, ticker, investment, mode, buy, sell, start_date,
         # Convert to a uniform structure like your other callback 
         #hist = data.reset_index() 
         #hist.rename(columns={"Date": "Datetime"}, inplace=True)
-        hist = yf.download(ticker, period="1y", interval="1d", auto_adjust=False, progress=False)
+        hist = get_price_history(ticker, period="1y", interval="1d")
         hist.reset_index(inplace=True)
         hist.columns = [col if isinstance(col, str) else col[0] for col in hist.columns]
         hist.rename(columns={"Date": "Datetime"}, inplace=True)    
         
-        # Generate MACD, RSI, EMA charts 
-        fig_macd, fig_rsi, fig_ema = generate_indicator_charts( hist, ticker, company_long_name, graph_properties ) 
+        # Bars for the MACD, RSI and EMA charts, which are drawn clientside
+        price_bars = price_bars_payload(hist, ticker, company_long_name)
         
         fig_graphical_calculator = update_graphical_calculator(ticker, buy, target_profit, investment, taxes, trading_fees)
 
@@ -2403,9 +4798,7 @@ def calculate_metrics(n_clicks, ticker, investment, mode, buy, sell, start_date,
         f"{round(tax_amount, 2)}",
         f"{round(net_gain_value, 2)}",
         f"{company_long_name}",
-        fig_macd,
-        fig_rsi,
-        fig_ema,
+        price_bars,
         f"{round(calculated_buy_price,6)}",
         f"{round(calculated_sell_price,6)}",
         f"{int(calculated_num_shares)}",
@@ -2414,6 +4807,55 @@ def calculate_metrics(n_clicks, ticker, investment, mode, buy, sell, start_date,
     )
 
 
+app.clientside_callback(
+    ClientsideFunction(namespace="indicators", function_name="zoom"),
+    Output("calculator-chart-range", "data"),
+    Input("calculator-price-bars", "data"),
+    Input("calculator-macd-performance-graph", "relayoutData"),
+    Input("calculator-rsi-performance-graph", "relayoutData"),
+    Input("calculator-ema-performance-graph", "relayoutData"),
+    prevent_initial_call=True
+)
+
+app.clientside_callback(
+    ClientsideFunction(namespace="indicators", function_name="render"),
+    Output("calculator-macd-performance-graph", "figure"),
+    Output("calculator-rsi-performance-graph", "figure"),
+    Output("calculator-ema-performance-graph", "figure"),
+    Input("calculator-price-bars", "data"),
+    Input("calculator-chart-range", "data"),
+    *[Input(f"indicator-{key.replace('_', '-')}", "value") for key in CHART_INDICATOR_PARAMS],
+)
+
+
+# --- Callback: Poll background warm-up ---
+@app.callback(
+    Output("warmup-store", "data"),
+    Output("warmup-interval", "disabled"),
+    Input("warmup-interval", "n_intervals"),
+    State("warmup-store", "data")
+)
+def poll_warmup(n_intervals, previous_ready):
+    status = get_warmup_status()
+    ready = sorted(status["ready"])
+    finished = status["state"] in ("ready", "degraded")
+
+    # Only touch the store when something new has loaded
+    return (ready if ready != previous_ready else no_update), finished
+
+
+@app.callback(
+    Output("exchange-chart", "figure", allow_duplicate=True),
+    Input("warmup-store", "data"),
+    State("country-store", "data"),
+    State("store-padded-values", "data"),
+    prevent_initial_call=True
+)
+def refresh_exchange_chart(warmup_ready_list, country, padded_values):
+    if not warmup_ready_list or f"index:{country}" not in warmup_ready_list or padded_values is None:
+        raise PreventUpdate
+    return create_figure(padded_values, country)
+
 
 # --- Callback: Click to reveal filename ---
 @app.callback(
@@ -2443,30 +4885,32 @@ def populate_filename(click_data, country, filenames):
     
     return ""
 
-# --- Callback: Download file from assets ---
+# --- Callback: Point the download buttons at the streaming routes ---
 @app.callback(
-    Output('download', 'data'),
-    Input('download-btn', 'n_clicks'),
-    State('filename-box', 'value'),
-    State('country-store', 'data'),  # ← Add this
-    #prevent_initial_call=True
+    Output('download-btn', 'href'),
+    Output('download-btn', 'disabled'),
+    Output('download-bundle-btn', 'href'),
+    Input('filename-box', 'value'),
+    Input('country-store', 'data'),
 )
-def serve_file(n_clicks, filename, country):
-    
+def serve_file(filename, country):
+
+    country = country or "UK"
+    bundle_href = f"/download/{country}/bundle.zip"
+
     if filename:
         file_path_raw_data = os.path.join(DATA_ROOT, country, filename)
         #print(f"[Download Triggered] Country: {country}, Filename: {filename}")
         #print(f"[Full Path] {file_path_raw_data}")
         
         if os.path.exists(file_path_raw_data):
-            return send_file(file_path_raw_data)
-    return None
+            return f"/download/{country}/{filename}", False, bundle_href
+    return None, True, bundle_href
     
     
     
 @app.callback(
-    Output("store-df-batch", "data"),
-    Output("store-df-buysell", "data"),
+    Output("store-dataset-key", "data"),
     Output("store-padded-filenames", "data"),
     Output("store-padded-values", "data"),
     Output("store-sector-options", "data"),
@@ -2475,14 +4919,36 @@ def serve_file(n_clicks, filename, country):
 )
 def save_country_selection(selected_country):
 
-    df, df_buysell, padded_filenames, padded_values, sector_options = load_country_data(selected_country)
-    
-    # Convert DataFrames to JSON-serializable format
-    df_json = df.to_dict("records")
-    df_buysell_json = df_buysell.to_dict("records")
+    # The frames stay server-side, the browser only gets the registry key
+    dataset_key = register_country_data(selected_country)
+    _, _, padded_filenames, padded_values, sector_options, _ = get_dataset(dataset_key)
     
     #return selected_country
-    return df_json, df_buysell_json, padded_filenames, padded_values, sector_options, selected_country
+    return dataset_key, padded_filenames, padded_values, sector_options, selected_country
+
+
+@app.callback(
+    Output("store-dataset-key", "data", allow_duplicate=True),
+    Output("store-padded-filenames", "data", allow_duplicate=True),
+    Output("store-padded-values", "data", allow_duplicate=True),
+    Output("store-sector-options", "data", allow_duplicate=True),
+    Output("country-store", "data", allow_duplicate=True),
+    Input("snapshot-interval", "n_intervals"),
+    State("store-dataset-key", "data"),
+    State("country-store", "data"),
+    prevent_initial_call=True
+)
+def refresh_dataset_key(n_intervals, dataset_key, selected_country):
+
+    with dataset_registry_lock:
+        live_key = dataset_current.get(selected_country)
+
+    if not live_key or live_key == dataset_key:
+        raise PreventUpdate
+
+    # Re-sending country-store re-runs every page callback against the new key
+    _, _, padded_filenames, padded_values, sector_options, _ = get_dataset(live_key)
+    return live_key, padded_filenames, padded_values, sector_options, selected_country
 
 
 @app.callback(
@@ -2497,20 +4963,20 @@ def save_country_selection(selected_country):
     Input({'type': 'sector-btn', 'index': dash.ALL}, "n_clicks"),
     Input("bar-graph", "clickData"),
     State("selected-sector-store", "data"),
-    State("store-df-batch", "data"),
+    State("store-dataset-key", "data"),
     State("store-padded-values", "data"),
     prevent_initial_call=True
 )
-def update_homepage(country, n_clicks_list, click_data, stored_sector, df_data, stored_padded_values):
+def update_homepage(country, n_clicks_list, click_data, stored_sector, dataset_key, stored_padded_values):
 
     #df, _, _, padded_values, _ = load_country_data(country)
-    df = pd.DataFrame(df_data)
+    df, *_ = get_dataset(dataset_key)
     padded_values = stored_padded_values
     main_figure = create_figure(padded_values, country)
 
 
     # Sector totals
-    sector_profits = df.groupby("Sector")["Total Profit"].sum()
+    sector_profits = df.groupby("Sector", observed=True)["Total Profit"].sum()
     total_profit = sector_profits.sum()
 
     sector_cards = [
@@ -2583,7 +5049,7 @@ def update_homepage(country, n_clicks_list, click_data, stored_sector, df_data,
         clicked_industry = click_data["points"][0]["x"]
         filtered_df = filtered_df[filtered_df["Industry"] == clicked_industry]
 
-    industry_totals = df[df["Sector"] == selected_sector].groupby("Industry")["Total Profit"].sum().reset_index()
+    industry_totals = df[df["Sector"] == selected_sector].groupby("Industry", observed=True)["Total Profit"].sum().reset_index()
 
     bar_figure = px.bar(
         industry_totals,
@@ -2603,6 +5069,9 @@ def update_homepage(country, n_clicks_list, click_data, stored_sector, df_data,
         yaxis=dict(mirror=True, ticks='outside', showline=True, linecolor='lightgrey')
     )
 
+    # The rows most likely to be clicked next
+    schedule_prefetch(filtered_df.nlargest(PREFETCH_TOP_N, "Total Profit")["Ticker"].dropna().tolist(), dataset_key)
+
     return main_figure, bar_figure, filtered_df.to_dict("records"), selected_sector, buttons, sector_summary, ""
 
 
@@ -2615,15 +5084,14 @@ def treemap_get_company_info_batched(ticker_list, batch_size=50):
 
     def treemap_process_batch(batch):
         try:
-            tickers_data = yf.Tickers(" ".join(batch))
-            tickers = tickers_data.tickers
+            tickers = market_data_provider.ticker_info(batch)
         except Exception as e:
             print(f"⚠️ Error fetching batch: {e}")
             return
 
         for symbol in batch:
             try:
-                info = tickers[symbol].info
+                info = tickers[symbol]
                 market_cap = info.get("marketCap")
                 if not isinstance(market_cap, (int, float)):
                     continue
@@ -2776,28 +5244,21 @@ def create_treemap(df, sector, industry, selected_country):
 
 
 @app.callback(
-    Output("stored-data", "data"),
     Output("treemap_sector-dropdown", "options"),
     Output("treemap_sector-dropdown", "value"),  # 👈 Clear selection
     Output("treemap_industry-dropdown", "value"),  # 👈 Clear selection
     Output("treemap-output", "figure", allow_duplicate=True),
     Input("country-store", "data"),
-    State("store-df-batch", "data"),
-    #State("store-df-buysell", "data"),
     State("store-sector-options", "data"),
     prevent_initial_call=True
 )
-def update_all_on_country_change(selected_country, df_data, df_sector_options):
+def update_all_on_country_change(selected_country, df_sector_options):
     if not selected_country:
-        return no_update, no_update, no_update, no_update, no_update
+        return no_update, no_update, no_update, no_update
 
     # Load full country data
     #df_batch, df_buysell, _, _, sector_options = load_country_data(selected_country)
     
-    # Reconstruct DataFrames from stored data
-    df_batch = pd.DataFrame(df_data)
-    ### Vip removed df_buysell
-    #df_buysell = pd.DataFrame(df_buysell_data)
     sector_options = df_sector_options  # Already a list
     # Format sector dropdown
     #sector_dropdown_options = [{"label": s, "value": s} for s in sector_options]
@@ -2811,7 +5272,6 @@ def update_all_on_country_change(selected_country, df_data, df_sector_options):
 
     # Clear both dropdowns and treemap
     return (
-        df_batch.to_dict("records"),
         sector_dropdown_options,
         None,  # Clear sector selection
         None,  # Clear industry selection
@@ -2826,12 +5286,12 @@ def update_all_on_country_change(selected_country, df_data, df_sector_options):
 @app.callback(
     Output("treemap_industry-dropdown", "options"),
     Input("treemap_sector-dropdown", "value"),
-    State("stored-data", "data")
+    State("store-dataset-key", "data")
 )
-def update_industry_options(selected_sector, stored_df):
-    if not selected_sector or not stored_df:
+def update_industry_options(selected_sector, dataset_key):
+    if not selected_sector or not dataset_key:
         return []
-    df = pd.DataFrame(stored_df)
+    df, *_ = get_dataset(dataset_key)
     industries = sorted(df[df["Sector"] == selected_sector]["Industry"].dropna().unique())
     return [{"label": i, "value": i} for i in industries]
 
@@ -2842,14 +5302,14 @@ def update_industry_options(selected_sector, stored_df):
     Input("treemap_submit-button", "n_clicks"),
     State("treemap_sector-dropdown", "value"),
     State("treemap_industry-dropdown", "value"),
-    State("stored-data", "data"),
+    State("store-dataset-key", "data"),
     State("country-store", "data")
 )
-def update_treemap(n_clicks, selected_sector, selected_industry, stored_df, selected_country):
-    if not selected_sector or not selected_industry or not stored_df:
+def update_treemap(n_clicks, selected_sector, selected_industry, dataset_key, selected_country):
+    if not selected_sector or not selected_industry or not dataset_key:
         return px.scatter(title="Please select both Sector and Industry"), False
 
-    df = pd.DataFrame(stored_df)
+    df, *_ = get_dataset(dataset_key)
     filtered_df = df[
         (df["Sector"] == selected_sector) &
         (df["Industry"] == selected_industry)
@@ -2896,21 +5356,40 @@ def update_treemap(n_clicks, selected_sector, selected_industry, stored_df, sele
         Input("trend-mode", "value"),
         Input("region-select", "value"),
         Input("sector-subtabs", "active_tab"),   # IMPORTANT
+        Input("warmup-store", "data"),
     ]
 )
-def update_sector_indices_page(lookback, mode, region, active_tab):
+def update_sector_indices_page(lookback, mode, region, active_tab, warmup_ready_list):
 
     # -----------------------------
     # Select dataset
     # -----------------------------
-    if region == "UK":
-        active_data = uk_sector_indices_data
-    elif region == "US":
-        active_data = us_sector_indices_data
-    elif region == "METALS":
-        active_data = metals_indices_data
-    else:
-        active_data = crypto_indices_data
+    active_data = sector_indices_data.get(region, {})
+
+    if not active_data:
+        if f"sectors:{region}" in get_warmup_status()["errors"]:
+            message = "Sector data is unavailable right now."
+        else:
+            message = "Sector data is still loading…"
+        placeholder = html.Div(message, style={"padding": "20px", "color": "#6c757d"})
+        return placeholder, "", "", ""
+
+    # -----------------------------
+    # Indicators for every sector in one pass (full history, then sliced)
+    # -----------------------------
+    closes = pd.DataFrame({name: df["Close"] for name, df in active_data.items()})
+    close_values = closes.T.to_numpy(dtype=float)
+
+    def sector_panel(values):
+        return pd.DataFrame(values.T, index=closes.index, columns=closes.columns).tail(lookback)
+
+    if mode == "rsi":
+        rsi_panel = sector_panel(rsi(close_values, 14))
+    elif mode == "macd":
+        macd_values, signal_values, momentum_values = macd(close_values)
+        macd_panel = sector_panel(macd_values)
+        signal_panel = sector_panel(signal_values)
+        momentum_panel = sector_panel(momentum_values)
 
     # ============================================================
     # 1. RANKING PANEL (always visible)
@@ -2927,21 +5406,10 @@ def update_sector_indices_page(lookback, mode, region, active_tab):
             score = df_slice["DPCM_raw"].sum()
 
         elif mode == "rsi":
-            delta = df_slice["Close"].diff()
-            up = delta.clip(lower=0)
-            down = -delta.clip(upper=0)
-            roll_up = up.ewm(span=14, adjust=False).mean()
-            roll_down = down.ewm(span=14, adjust=False).mean()
-            rs = roll_up / roll_down
-            rsi = 100 - (100 / (1 + rs))
-            score = rsi.iloc[-1]
+            score = rsi_panel[name].iloc[-1]
 
         elif mode == "macd":
-            ema12 = df_slice["Close"].ewm(span=12, adjust=False).mean()
-            ema26 = df_slice["Close"].ewm(span=26, adjust=False).mean()
-            macd_line = ema12 - ema26
-            signal_line = macd_line.ewm(span=9, adjust=False).mean()
-            score = (macd_line - signal_line).iloc[-1]
+            score = momentum_panel[name].iloc[-1]
 
         ranking.append((name, score))
 
@@ -3002,8 +5470,8 @@ def update_sector_indices_page(lookback, mode, region, active_tab):
                 # 1. Baseline trace (invisible)
                 # ---------------------------------------
                 fig.add_trace(go.Scatter(
-                    x=df_slice.index,
-                    y=[df_slice["Close"].min()] * len(df_slice),
+                    x=compact_x(df_slice.index[[0, -1]])[0],
+                    y=[df_slice["Close"].min()] * 2,
                     mode="lines",
                     line=dict(color="rgba(0,0,0,0)"),
                     showlegend=False
@@ -3012,9 +5480,9 @@ def update_sector_indices_page(lookback, mode, region, active_tab):
                 # ---------------------------------------
                 # 2. Filled price line
                 # ---------------------------------------
-                fig.add_trace(go.Scatter(
-                    x=df_slice.index,
-                    y=df_slice["Close"],
+                fig.add_trace(line_trace(
+                    df_slice.index,
+                    df_slice["Close"],
                     mode="lines",
                     name="Sector Index",
                     fill='tonexty',   # <-- fills to the baseline, NOT to zero
@@ -3026,8 +5494,8 @@ def update_sector_indices_page(lookback, mode, region, active_tab):
                 # 3. Weighted pulses
                 # ---------------------------------------
                 fig.add_trace(go.Bar(
-                    x=df_slice.index,
-                    y=df_slice["DPCM_raw"],
+                    x=compact_x(df_slice.index)[0],
+                    y=df_slice["DPCM_raw"].to_numpy(dtype=float),
                     name="Weighted Pulses",
                     marker_color="#78afd9",
                     opacity=0.6
@@ -3038,14 +5506,8 @@ def update_sector_indices_page(lookback, mode, region, active_tab):
             # RSI
             # -----------------------------
             elif mode == "rsi":
-                delta = df_slice["Close"].diff()
-                up = delta.clip(lower=0)
-                down = -delta.clip(upper=0)
-                roll_up = up.ewm(span=14, adjust=False).mean()
-                roll_down = down.ewm(span=14, adjust=False).mean()
-                rs = roll_up / roll_down
-                rsi = 100 - (100 / (1 + rs))
-                rsi_last = rsi.iloc[-1]
+                sector_rsi = rsi_panel[name]
+                rsi_last = sector_rsi.iloc[-1]
                 direction = "UP" if rsi_last > 55 else "DOWN" if rsi_last < 45 else "NEUTRAL"
 
                 fig = make_subplots(specs=[[{"secondary_y": True}]])
@@ -3056,35 +5518,26 @@ def update_sector_indices_page(lookback, mode, region, active_tab):
                 #    line=dict(color="black")
                 #), secondary_y=False)
 
-                fig.add_trace(go.Scatter(
-                    x=df_slice.index, y=rsi,
+                fig.add_trace(line_trace(
+                    sector_rsi.index, sector_rsi,
                     mode="lines", name="RSI",
                     line=dict(color="#78afd9"),
                     fill='tozeroy',
                     fillcolor='rgba(214,235,255,0.5)'
                 ), secondary_y=True)
 
-                fig.add_trace(go.Scatter(
-                    x=df_slice.index, y=[70]*len(df_slice),
-                    mode="lines", name="Overbought (70)",
-                    line=dict(color="grey", dash="dot")
-                ), secondary_y=True)
-
-                fig.add_trace(go.Scatter(
-                    x=df_slice.index, y=[30]*len(df_slice),
-                    mode="lines", name="Oversold (30)",
-                    line=dict(color="green", dash="dot")
-                ), secondary_y=True)
+                fig.add_hline(y=70, line=dict(color="grey", dash="dot"),
+                              annotation_text="Overbought (70)", secondary_y=True)
+                fig.add_hline(y=30, line=dict(color="green", dash="dot"),
+                              annotation_text="Oversold (30)", secondary_y=True)
 
             # -----------------------------
             # MACD
             # -----------------------------
             elif mode == "macd":
-                ema12 = df_slice["Close"].ewm(span=12, adjust=False).mean()
-                ema26 = df_slice["Close"].ewm(span=26, adjust=False).mean()
-                macd_line = ema12 - ema26
-                signal_line = macd_line.ewm(span=9, adjust=False).mean()
-                momentum = macd_line - signal_line
+                macd_line = macd_panel[name]
+                signal_line = signal_panel[name]
+                momentum = momentum_panel[name]
 
                 direction = "UP" if macd_line.iloc[-1] > signal_line.iloc[-1] else \
                             "DOWN" if macd_line.iloc[-1] < signal_line.iloc[-1] else "NEUTRAL"
@@ -3097,20 +5550,20 @@ def update_sector_indices_page(lookback, mode, region, active_tab):
                 #    line=dict(color="black")
                 #), secondary_y=False)
 
-                fig.add_trace(go.Scatter(
-                    x=df_slice.index, y=macd_line,
+                fig.add_trace(line_trace(
+                    macd_line.index, macd_line,
                     mode="lines", name="MACD",
                     line=dict(color="green")
                 ), secondary_y=True)
 
-                fig.add_trace(go.Scatter(
-                    x=df_slice.index, y=signal_line,
+                fig.add_trace(line_trace(
+                    signal_line.index, signal_line,
                     mode="lines", name="Signal Line",
                     line=dict(color="grey", dash="dot")
                 ), secondary_y=True)
 
-                fig.add_trace(go.Scatter(
-                    x=df_slice.index, y=momentum,
+                fig.add_trace(line_trace(
+                    momentum.index, momentum,
                     mode="lines", name="Momentum",
                     fill='tozeroy',
                     fillcolor='rgba(214,235,255,0.5)',
@@ -3130,8 +5583,8 @@ def update_sector_indices_page(lookback, mode, region, active_tab):
                 # 1. Baseline trace (invisible)
                 # ---------------------------------------
                 fig.add_trace(go.Scatter(
-                    x=df_slice.index,
-                    y=[df_slice["Close"].min()] * len(df_slice),
+                    x=compact_x(df_slice.index[[0, -1]])[0],
+                    y=[df_slice["Close"].min()] * 2,
                     mode="lines",
                     line=dict(color="rgba(0,0,0,0)"),
                     showlegend=False
@@ -3140,9 +5593,9 @@ def update_sector_indices_page(lookback, mode, region, active_tab):
                 # ---------------------------------------
                 # 2. Filled price line
                 # ---------------------------------------
-                fig.add_trace(go.Scatter(
-                    x=df_slice.index,
-                    y=df_slice["Close"],
+                fig.add_trace(line_trace(
+                    df_slice.index,
+                    df_slice["Close"],
                     mode="lines",
                     name="Sector Index",
                     fill='tonexty',   # <-- fills to baseline, not zero
@@ -3153,9 +5606,9 @@ def update_sector_indices_page(lookback, mode, region, active_tab):
                 # ---------------------------------------
                 # 3. Pulse (DPCM_q) line
                 # ---------------------------------------
-                fig.add_trace(go.Scatter(
-                    x=df_slice.index,
-                    y=df_slice["DPCM_q"],
+                fig.add_trace(line_trace(
+                    df_slice.index,
+                    df_slice["DPCM_q"],
                     mode="lines",
                     name="DPCM",
                     line=dict(color="#78afd9", shape="hv")
@@ -3175,6 +5628,7 @@ def update_sector_indices_page(lookback, mode, region, active_tab):
 
             fig.update_xaxes(showgrid=True, gridcolor="lightgrey")
             fig.update_yaxes(showgrid=True, gridcolor="lightgrey")
+            compact_figure(fig)
 
             graphs.append(html.Div([dcc.Graph(figure=fig)], style={"margin-bottom": "40px"}))
 
@@ -3188,35 +5642,26 @@ def update_sector_indices_page(lookback, mode, region, active_tab):
 
         heatmap_data = {}
 
-        for name, df in active_data.items():
-            df_slice = df.tail(lookback)
+        if mode == "rsi":
+            scores = zscore(rsi_panel.T.to_numpy())
+            heatmap_data = {name: pd.Series(row, index=rsi_panel.index) for name, row in zip(rsi_panel.columns, scores)}
 
-            if mode == "pulse":
-                series = df_slice["DPCM_q"].cumsum()
+        elif mode == "macd":
+            smoothed = sector_panel(sma(momentum_values, 5))
+            scores = zscore(smoothed.T.to_numpy())
+            heatmap_data = {name: pd.Series(row, index=smoothed.index) for name, row in zip(smoothed.columns, scores)}
 
-            elif mode == "weighted":
-                series = df_slice["DPCM_raw"].cumsum()
+        else:
+            for name, df in active_data.items():
+                df_slice = df.tail(lookback)
 
-            elif mode == "rsi":
-                delta = df_slice["Close"].diff()
-                up = delta.clip(lower=0)
-                down = -delta.clip(upper=0)
-                roll_up = up.ewm(span=14, adjust=False).mean()
-                roll_down = down.ewm(span=14, adjust=False).mean()
-                rs = roll_up / roll_down
-                series = 100 - (100 / (1 + rs))
-                series = (series - series.mean()) / (series.std() + 1e-9)
+                if mode == "pulse":
+                    series = df_slice["DPCM_q"].cumsum()
 
-            elif mode == "macd":
-                ema12 = df_slice["Close"].ewm(span=12, adjust=False).mean()
-                ema26 = df_slice["Close"].ewm(span=26, adjust=False).mean()
-                macd_line = ema12 - ema26
-                signal_line = macd_line.ewm(span=9, adjust=False).mean()
-                hist = macd_line - signal_line
-                series = hist.rolling(5).mean()
-                series = (series - series.mean()) / (series.std() + 1e-9)
+                elif mode == "weighted":
+                    series = df_slice["DPCM_raw"].cumsum()
 
-            heatmap_data[name] = series
+                heatmap_data[name] = series
 
         common_index = sorted(set.intersection(*[set(s.index) for s in heatmap_data.values()]))
 
@@ -3267,20 +5712,10 @@ def update_sector_indices_page(lookback, mode, region, active_tab):
                 series = df_slice["DPCM_raw"]
 
             elif mode == "rsi":
-                delta = df_slice["Close"].diff()
-                up = delta.clip(lower=0)
-                down = -delta.clip(upper=0)
-                roll_up = up.ewm(span=14, adjust=False).mean()
-                roll_down = down.ewm(span=14, adjust=False).mean()
-                rs = roll_up / roll_down
-                series = 100 - (100 / (1 + rs))
+                series = rsi_panel[name]
 
             elif mode == "macd":
-                ema12 = df_slice["Close"].ewm(span=12, adjust=False).mean()
-                ema26 = df_slice["Close"].ewm(span=26, adjust=False).mean()
-                macd_line = ema12 - ema26
-                signal_line = macd_line.ewm(span=9, adjust=False).mean()
-                series = macd_line - signal_line
+                series = momentum_panel[name]
 
             # ---------------------------------------
             # Short-term momentum (dynamic)
@@ -3616,9 +6051,9 @@ def update_graphical_calculator(stock_symbol, purchase_price, desired_profit, ma
     
     target_profit = float(desired_profit)
 
-    # Fetch last 5 days of stock data
+    # Last 5 trading days, taken from the stored daily bars
     try:
-        data = yf.Ticker(stock_symbol).history(period="5d")
+        data = get_price_history(stock_symbol, period="1y", auto_adjust=True).tail(5)
         if data.empty:
             five_day_low = None
             five_day_high = None
@@ -3673,5 +6108,8 @@ def update_graphical_calculator(stock_symbol, purchase_price, desired_profit, ma
 
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    try:
+        app.run(debug=True)
+    finally:
+        stop_rns_crawler()
     
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+The chart indicators (StreamingIndicators / get_chart_indicators) must stay
+identical to the indicator engine they are seeded from.
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+os.environ.setdefault("STOCKDASH_PROVIDER", "replay")
+os.environ["STOCKDASH_BACKGROUND_JOBS"] = "0"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import mypowerBY  # noqa: E402
+
+
+def closes_with_gaps(n=400, seed=3):
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    closes[:5] = np.nan                         # series starts late
+    closes[rng.choice(np.arange(10, n), 20)] = np.nan   # gaps
+    closes[200:230] = closes[199]              # flat stretch (RSI avg_loss reaches ~0)
+    return closes
+
+
+def engine_rows(closes):
+    spans = mypowerBY.StreamingIndicators.SPANS
+    macd_line, signal_line, histogram = mypowerBY.macd(closes, spans["ema_12"], spans["ema_26"], spans["signal"])
+    return np.column_stack([
+        mypowerBY.ema(closes, spans["ema_10"]),
+        mypowerBY.ema(closes, spans["ema_30"]),
+        mypowerBY.rsi(closes, mypowerBY.StreamingIndicators.RSI_PERIOD),
+        macd_line, signal_line, histogram,
+    ])
+
+
+def assert_rows_close(actual, expected):
+    np.testing.assert_allclose(np.asarray(actual, dtype=float), expected, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+def test_stepping_matches_engine():
+    closes = closes_with_gaps()
+    assert_rows_close(mypowerBY.StreamingIndicators().update(closes), engine_rows(closes))
+
+
+@pytest.mark.parametrize("split", [0, 3, 6, 20, 399])
+def test_engine_state_continues_like_engine(split):
+    closes = closes_with_gaps()
+    rows, indicators = mypowerBY.StreamingIndicators.from_history(closes[:split])
+    stepped = indicators.update(closes[split:])
+    assert_rows_close(np.vstack([rows, np.reshape(stepped, (-1, rows.shape[1]))]), engine_rows(closes))
+
+
+def test_chart_indicators_match_engine_across_refreshes(tmp_path, monkeypatch):
+    monkeypatch.setattr(mypowerBY, "BAR_STORE_DIR", str(tmp_path))
+    closes = pd.Series(closes_with_gaps(), index=pd.bdate_range("2024-01-01", periods=400))
+
+    # First call builds the stored state, later calls only advance it
+    for end in (250, 251, 300, 400):
+        result = mypowerBY.get_chart_indicators("TEST.L", closes.iloc[:end])
+        assert_rows_close(result[mypowerBY.INDICATOR_COLUMNS].to_numpy(), engine_rows(closes.iloc[:end].to_numpy()))